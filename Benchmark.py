@@ -0,0 +1,320 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Diff import ResponseDiffer, body_digest
+from Metrics import UNCHANGED
+from Push import PushPlusNotifier, ServerChanTurboNotifier
+from Query import decode_response, fetch_data, handle_query_mode
+from Transport import QueryTransport
+
+# 模拟接口返回的三种阶段
+STAGE_NOT_ADMITTED = "not_admitted"
+STAGE_ADMITTED = "admitted"
+STAGE_EMS = "ems"
+
+
+# 构造模拟的查询结果
+def fake_payload(stage, ksh="25350101000001"):
+    if stage == STAGE_NOT_ADMITTED:
+        return {"ok": False, "msg": "暂无录取信息"}
+    return {
+        "ok": True,
+        "tdd": {
+            "xm": "测试考生",
+            "ksh": ksh,
+            "xy": "计算机与信息工程学院",
+            "result": "软件工程",
+            "tzsbh": "2025000123",
+            "dh": "EMS1234567890" if stage == STAGE_EMS else "暂未发出",
+            "txdz": "福建省厦门市集美区理工路600号"
+        }
+    }
+
+
+# 启动后台 HTTP 服务，返回 (server, 基础地址)
+def _serve(server):
+    threading.Thread(target=server.serve_forever, name=type(server).__name__, daemon=True).start()
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+class FakeQueryServer(ThreadingHTTPServer):
+    """本地模拟的录取查询接口：按时间切换阶段，可配置延迟与错误率"""
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, error_rate=0.0, admit_after=None, ems_after=None, port=0):
+        """
+        :param latency: 每次响应前的固定延迟（秒）
+        :param error_rate: 返回 HTTP 503 的概率
+        :param admit_after: 启动后多少秒开始返回"已录取"（为空则始终未录取）
+        :param ems_after: 启动后多少秒开始返回带 EMS 单号的结果
+        """
+        super().__init__(("127.0.0.1", port), _FakeQueryHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.admit_after = admit_after
+        self.ems_after = ems_after
+        self.started_at = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.base_url = _serve(self)
+        self.started_at = time.monotonic()
+        return self
+
+    @property
+    def url(self):
+        return f"{self.base_url}/query"
+
+    def stage_at(self, now):
+        elapsed = now - self.started_at
+        if self.ems_after is not None and elapsed >= self.ems_after:
+            return STAGE_EMS
+        if self.admit_after is not None and elapsed >= self.admit_after:
+            return STAGE_ADMITTED
+        return STAGE_NOT_ADMITTED
+
+    def published_at(self, stage):
+        """目标阶段开始对外可见的时间（monotonic）"""
+        offset = {STAGE_ADMITTED: self.admit_after, STAGE_EMS: self.ems_after}.get(stage)
+        return None if offset is None else self.started_at + offset
+
+
+class _FakeQueryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        if server.latency:
+            time.sleep(server.latency)
+        with server._lock:
+            server.requests += 1
+            failed = server.error_rate and random.random() < server.error_rate
+            if failed:
+                server.errors += 1
+        if failed:
+            self._reply(503, b'{"msg": "Service Unavailable"}')
+            return
+        body = json.dumps(fake_payload(server.stage_at(time.monotonic())), ensure_ascii=False).encode("utf-8")
+        self._reply(200, body)
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakePushServer(ThreadingHTTPServer):
+    """本地模拟的 PushPlus（/send）与 ServerChan（/<token>.send）推送接口"""
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, port=0):
+        super().__init__(("127.0.0.1", port), _FakePushHandler)
+        self.latency = latency
+        self.received = []  # [(monotonic 时间, 路径, 请求体)]
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.base_url = _serve(self)
+        return self
+
+    def first_received_at(self):
+        with self._lock:
+            return self.received[0][0] if self.received else None
+
+
+class _FakePushHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if server.latency:
+            time.sleep(server.latency)
+        with server._lock:
+            server.received.append((time.monotonic(), self.path, payload))
+        # PushPlus 成功码为 200，ServerChan 成功码为 0
+        code = 200 if self.path == "/send" else 0
+        body = json.dumps({"code": code, "msg": "ok"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# 创建指向本地模拟推送接口的推送器
+def fake_notifier(method, push_server):
+    if method == "pushplus":
+        notifier = PushPlusNotifier("bench", "录取通知", "基准测试", interval_seconds=0)
+        notifier.url = f"{push_server.base_url}/send"
+    elif method == "serverchan_turbo":
+        notifier = ServerChanTurboNotifier("bench", "录取通知", "基准测试", interval_seconds=0)
+        notifier.url_template = push_server.base_url + "/{token}.send"
+    else:
+        return None
+    return notifier
+
+
+# 计算百分位数（最近秩法）
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class BenchmarkResult:
+    """基准测试结果汇总"""
+
+    def __init__(self):
+        self.queries = 0
+        self.errors = 0
+        self.latencies = []  # 每次 fetch_data 的耗时（秒）
+        self.elapsed = 0.0
+        self.detected_at = None
+        self.pushed_at = None
+        self.published_at = None
+
+    @property
+    def qps(self):
+        return self.queries / self.elapsed if self.elapsed else 0.0
+
+    def report(self):
+        lines = [
+            f"查询次数：{self.queries}，失败：{self.errors}，耗时：{self.elapsed:.2f}s",
+            f"吞吐量：{self.qps:.1f} 次/秒",
+            f"查询延迟：p50 {percentile(self.latencies, 50) * 1000:.2f}ms，"
+            f"p99 {percentile(self.latencies, 99) * 1000:.2f}ms",
+        ]
+        if self.published_at is not None and self.detected_at is not None:
+            lines.append(f"发布→检测：{(self.detected_at - self.published_at) * 1000:.1f}ms")
+        if self.published_at is not None and self.pushed_at is not None:
+            lines.append(f"发布→推送送达：{(self.pushed_at - self.published_at) * 1000:.1f}ms")
+        return "\n".join(lines)
+
+
+# 运行基准测试：多个线程各自执行 fetch_data → handle_query_mode → 推送
+def run_benchmark(duration=5.0, concurrency=1, query_mode=1, push_method="pushplus", latency=0.0,
+                  error_rate=0.0, admit_after=None, ems_after=None, push_latency=0.0, quiet=True):
+    query_server = FakeQueryServer(latency, error_rate, admit_after, ems_after).start()
+    push_server = FakePushServer(push_latency).start()
+    transport = QueryTransport(url=query_server.url, pool_size=concurrency)
+    result = BenchmarkResult()
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    target_stage = STAGE_EMS if query_mode == 2 else STAGE_ADMITTED
+
+    def worker(index):
+        config = {"query_mode": query_mode}
+        notifier = fake_notifier(push_method, push_server)
+        differ = ResponseDiffer()
+        last_response = None
+        last_digest = None
+        latencies = []
+        queries = errors = 0
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            queries += 1
+            try:
+                response = fetch_data(f"{index:014d}", "350201200001011234", transport)
+            except Exception:
+                errors += 1
+                continue
+            received = time.monotonic()
+            latencies.append(received - started)
+            digest = body_digest(response.content)
+            if digest == last_digest:
+                UNCHANGED.inc()
+                continue
+            previous = last_response
+            response_json = decode_response(response)
+            last_response, should_stop = handle_query_mode(
+                response_json, config, last_response, notifier, time.strftime("%H:%M:%S"), differ
+            )
+            last_digest = digest
+            # 模式3不会停止，以首次检测到变更作为检测时间
+            changed = query_mode == 3 and previous is not None and last_response is not previous
+            if should_stop or changed:
+                with lock:
+                    if result.detected_at is None:
+                        result.detected_at = received
+            if should_stop:
+                break
+        with lock:
+            result.queries += queries
+            result.errors += errors
+            result.latencies.extend(latencies)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    # handle_query_mode 会打印查询结果，压测时屏蔽控制台输出
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, \
+            contextlib.redirect_stdout(devnull) if quiet else contextlib.nullcontext():
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    result.elapsed = time.monotonic() - started
+
+    result.published_at = query_server.published_at(target_stage)
+    result.pushed_at = push_server.first_received_at()
+    transport.close()
+    query_server.shutdown()
+    push_server.shutdown()
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="查询流程端到端基准测试（使用本地模拟接口）")
+    parser.add_argument("--duration", type=float, default=5.0, help="最长运行时间（秒）")
+    parser.add_argument("--concurrency", type=int, default=1, help="并发查询线程数")
+    parser.add_argument("--mode", type=int, default=1, choices=[1, 2, 3], help="查询模式")
+    parser.add_argument("--push", default="pushplus", choices=["pushplus", "serverchan_turbo", "none"])
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟查询接口延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟查询接口 503 概率")
+    parser.add_argument("--admit-after", type=float, help="多少秒后返回已录取")
+    parser.add_argument("--ems-after", type=float, help="多少秒后返回 EMS 单号")
+    parser.add_argument("--push-latency", type=float, default=0.0, help="模拟推送接口延迟（秒）")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    bench = run_benchmark(
+        duration=args.duration,
+        concurrency=args.concurrency,
+        query_mode=args.mode,
+        push_method=args.push,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        admit_after=args.admit_after,
+        ems_after=args.ems_after,
+        push_latency=args.push_latency
+    )
+    print(bench.report())
@@ -0,0 +1,79 @@
+import threading
+import time
+
+from Errors import CircuitOpenError, QueryConnectionError, QueryServerError, QueryTimeoutError
+
+# 计入熔断的错误类型：说明服务器过载或不可达，而非请求本身有误
+TRIPPING_ERRORS = (QueryTimeoutError, QueryConnectionError, QueryServerError)
+
+
+class CircuitBreaker:
+    """查询接口熔断器
+
+    关闭：正常放行；连续失败达到阈值后打开。
+    打开：直接拒绝查询，等待 recovery_timeout 秒后进入半开。
+    半开：只放行少量探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0, half_open_max_calls=1):
+        """
+        :param failure_threshold: 连续失败多少次后打开
+        :param recovery_timeout: 打开后多少秒进入半开状态
+        :param half_open_max_calls: 半开状态下同时允许的探测请求数
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        breaker = config.get('circuit_breaker') or {}
+        if not breaker.get('enabled', True):
+            return None
+        return cls(
+            failure_threshold=breaker.get('failure_threshold', 5),
+            recovery_timeout=breaker.get('recovery_timeout', 30.0)
+        )
+
+    def before_call(self):
+        """发出请求前调用：熔断打开时抛出 CircuitOpenError"""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.recovery_timeout - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(f"熔断中，{remaining:.1f}秒后重试", remaining)
+                self.state = self.HALF_OPEN
+                self._probes = 0
+            if self.state == self.HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    raise CircuitOpenError("熔断半开，等待探测请求结果", self.recovery_timeout)
+                self._probes += 1
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probes = 0
+
+    def record_failure(self, error):
+        """记录失败；仅超时、连接错误与 5xx 计入熔断，其余错误说明服务器仍有响应，按成功处理"""
+        if not isinstance(error, TRIPPING_ERRORS):
+            self.record_success()
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"查询接口连续失败{self.failures}次，熔断{self.recovery_timeout}秒")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probes = 0
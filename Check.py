@@ -0,0 +1,122 @@
+import argparse
+import sys
+import time
+
+from Config import StateStore, apply_env_overrides, read_config
+from Diff import body_digest
+from Endpoints import create_transport
+from Query import decode_response, fetch_data, format_partial_hide, handle_query_mode, init_notifier
+
+# 退出码：供 cron / CI 判断本次检查的结果
+EXIT_OK = 0  # 查询成功，尚未满足停止条件
+EXIT_FAILED = 1  # 查询或解析失败
+EXIT_CONFIG = 2  # 未配置考生信息
+EXIT_DONE = 3  # 已检测到目标结果（本次或此前），可停止调度
+
+
+class LazyNotifier:
+    """推送器代理：需要推送时才导入推送模块并创建推送器，并记录推送是否送达"""
+
+    def __init__(self, push):
+        self.push = push
+        self.delivered = False
+        self.error = None
+
+    def send(self, title=None, message=None):
+        notifier = init_notifier(
+            self.push['method'], self.push.get('pushplus_token'), self.push.get('serverchan_token')
+        )
+        try:
+            self.delivered = bool(notifier and notifier.send(title, message))
+        except Exception as e:
+            self.error = str(e)
+            raise
+        return self.delivered
+
+
+# 是否配置了可用的推送方式（不导入推送模块即可判断）
+def push_configured(push):
+    methods = {method.strip() for method in str(push.get('method', "none")).split(",")}
+    return bool(("pushplus" in methods and push.get('pushplus_token')) or
+                ("serverchan_turbo" in methods and push.get('serverchan_token')))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="厦门理工学院录取查询（单次检查，适用于 cron 定时任务）")
+    parser.add_argument("--config", default="config.json", help="配置文件路径（默认 config.json）")
+    parser.add_argument("--state", default="state.json", help="查询状态文件路径（默认 state.json）")
+    parser.add_argument("--force", action="store_true", help="此前已检测到目标结果时仍然查询")
+    return parser.parse_args(argv)
+
+
+# 单次检查：查询一次 → 规则判断 → 按需推送 → 保存状态，返回退出码
+def run_check(config, state, force=False):
+    ksh, sfzh = config['ksh'], config['sfzh'].upper()
+    label = format_partial_hide(ksh)
+    check_key = f"check:{ksh}"
+    check = state.get(check_key) or {}
+    if check.get("done") and not force:
+        print(f"{label} 此前已检测到目标结果，跳过查询")
+        return EXIT_DONE
+
+    current_time = time.strftime("%H:%M:%S")
+    transport = create_transport(config)
+    try:
+        response = fetch_data(ksh, sfzh, transport)
+        print(f"[{current_time}] {label} 状态码：{response.status_code}")
+
+        # 响应体与上次检查逐字节相同时无需解析与判断
+        digest = body_digest(response.content).hex()
+        if digest == check.get("digest") and not force:
+            print("结果无变化")
+            return EXIT_OK
+
+        response_json = decode_response(response)
+        if (config.get('history') or {}).get('enabled', True):
+            from History import HistoryStore
+            history = HistoryStore.from_config(config)
+            try:
+                history.record(ksh, response_json, 0)  # 单次检查没有连续的查询序号
+            finally:
+                history.close()
+
+        notifier = LazyNotifier(config['push']) if push_configured(config['push']) else None
+        last_response, should_stop = handle_query_mode(
+            response_json, config, state.get(ksh, config.get('last_response')), notifier, current_time
+        )
+        state.set(ksh, last_response)
+
+        # 推送失败时不记录摘要与完成标记，下次检查重新判断并推送
+        push_failed = notifier is not None and notifier.error is not None
+        state.set(check_key, {
+            "digest": None if push_failed else digest,
+            "done": should_stop and not push_failed
+        })
+        if should_stop:
+            print(f"{label} 已检测到目标结果")
+            return EXIT_DONE
+        return EXIT_OK
+    except Exception as e:
+        print(f"{label} 查询失败: {str(e)}")
+        return EXIT_FAILED
+    finally:
+        transport.close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = read_config(args.config)
+    apply_env_overrides(config)
+    if not config['ksh'] or not config['sfzh']:
+        print("未配置考生信息：请在配置文件中填写 ksh/sfzh，或设置 XMUT_KSH/XMUT_SFZH")
+        return EXIT_CONFIG
+
+    state = StateStore(args.state)
+    try:
+        return run_check(config, state, args.force)
+    finally:
+        state.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
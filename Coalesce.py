@@ -0,0 +1,256 @@
+import threading
+import time
+
+from Dispatcher import DeliveryReceipt
+from Metrics import NOTIFY_EVENTS
+
+
+class PendingEvent:
+    """某考生在窗口内尚未送达的推送事件：只保留最新内容，并记录合并了几次更新"""
+
+    __slots__ = ("label", "title", "message", "count")
+
+    def __init__(self, label, title, message, count=1):
+        self.label = label  # 汇总消息中显示的考生标识（脱敏考生号）
+        self.title = title
+        self.message = message
+        self.count = count
+
+
+class Channel:
+    """一个推送渠道（同一推送配置）：共享的推送器 + 按考生合并的待发事件"""
+
+    def __init__(self, notifier):
+        self.notifier = notifier
+        self.pending = {}  # 考生号 -> PendingEvent（按首次产生事件的顺序）
+        self.due = None  # 下次发送时间（monotonic），没有待发事件时为 None
+        self.last_flush = None
+        self.in_flight = 0  # 已交给推送调度器、尚未结束的汇总消息数
+
+
+class CoalescedNotifier:
+    """与 NotifierBase 接口一致的代理：send 只把事件交给合并器，立即返回"""
+
+    queued = True
+
+    def __init__(self, coalescer, channel, key, label=None):
+        self.coalescer = coalescer
+        self.channel = channel
+        self.key = key
+        self.label = key if label is None else label
+
+    def send(self, title=None, message=None):
+        return self.coalescer.submit(self.channel, self.key, title, message, self.label)
+
+    def __getattr__(self, name):
+        return getattr(self.channel.notifier, name)
+
+
+class NotificationCoalescer:
+    """推送合并器：在时间窗口内收集推送事件，同一考生的事件合并为最新一条，
+    同一渠道的多名考生合成一条汇总消息，交给推送调度器发送（沿用其回执、失败重试与积压合并）。
+
+    渠道空闲时第一条事件立即发送，之后同一窗口内的事件合并到窗口结束再发；
+    因频率限制跳过、重试后仍失败或推送队列已满时事件退回，下个窗口重发，只有超出推送有效时长
+    （或关闭时仍未送达）才丢弃，并计入 xmut_notification_events_total{result="dropped"}。
+    """
+
+    def __init__(self, dispatcher, window=10.0, max_candidates=20, clock=time.monotonic):
+        """
+        :param dispatcher: 推送调度器（NotificationDispatcher），汇总消息经其发送
+        :param window: 合并窗口（秒），同一渠道两次发送至少间隔该时长
+        :param max_candidates: 一条汇总消息最多包含的考生数，其余留到下个窗口
+        """
+        self.dispatcher = dispatcher
+        self.window = window
+        self.max_candidates = max_candidates
+        self.clock = clock
+        self._channels = {}  # 渠道标识 -> Channel
+        self._condition = threading.Condition()
+        self._closing = False
+        self._flushed = False  # 关闭时已发出剩余事件，之后未送达的直接计为丢弃
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, config, dispatcher):
+        coalesce = config.get('coalesce') or {}
+        window = coalesce.get('window', 10.0)
+        if not window or window <= 0:
+            return None
+        return cls(dispatcher, window=window, max_candidates=coalesce.get('max_candidates', 20))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="notification-coalescer", daemon=True)
+            self._thread.start()
+        return self
+
+    def wrap(self, notifier, key, label=None, channel_key=None):
+        """包装推送器，为空时原样返回 None
+
+        :param key: 考生号（同一考生号的事件合并）
+        :param label: 汇总消息中显示的考生标识（如脱敏考生号），默认与 key 相同
+        :param channel_key: 渠道标识，标识相同的考生共用第一次传入的推送器（为空时按推送器实例区分）
+        """
+        if not notifier:
+            return None
+        channel_key = id(notifier) if channel_key is None else channel_key
+        with self._condition:
+            channel = self._channels.get(channel_key)
+            if channel is None:
+                channel = self._channels[channel_key] = Channel(notifier)
+        return CoalescedNotifier(self, channel, key, label)
+
+    def submit(self, channel, key, title=None, message=None, label=None):
+        """加入待发事件（不阻塞），返回是否已接收"""
+        NOTIFY_EVENTS.inc(result="received")
+        with self._condition:
+            if self._closing:
+                NOTIFY_EVENTS.inc(result="dropped")
+                return False
+            channel.notifier.start_episode()
+            self._merge(channel, key, PendingEvent(key if label is None else label, title, message))
+            if channel.due is None:
+                now = self.clock()
+                idle = channel.last_flush is None or now - channel.last_flush >= self.window
+                channel.due = now if idle else channel.last_flush + self.window
+            self._condition.notify()
+        return True
+
+    def _merge(self, channel, key, event, older=False):
+        """并入待发事件（调用方持有锁）：已有该考生的事件时保留较新的内容并累计次数
+
+        :param older: 为 True 表示 event 是未送达退回的旧事件，内容以已在等待的事件为准
+        """
+        existing = channel.pending.get(key)
+        if existing is None:
+            channel.pending[key] = event
+            return
+        if not older:
+            NOTIFY_EVENTS.inc(result="merged")
+            existing.title, existing.message = event.title, event.message
+        existing.count += event.count
+
+    def _take_due(self, flush_all=False):
+        """取出到期的渠道及其待发事件（调用方持有锁），返回 [(渠道, [(考生号, 事件), ...]), ...]
+
+        有汇总消息仍在调度器中的渠道暂不取出，等其结束后再发，避免被推送频率限制跳过。
+
+        :param flush_all: 关闭时取出全部渠道的全部事件，不受窗口、在途消息与单条消息考生数限制
+        """
+        now = self.clock()
+        batches = []
+        for channel in self._channels.values():
+            if channel.due is None or (not flush_all and (channel.due > now or channel.in_flight)):
+                continue
+            keys = list(channel.pending) if flush_all else list(channel.pending)[:self.max_candidates]
+            batches.append((channel, [(key, channel.pending.pop(key)) for key in keys]))
+            channel.last_flush = now
+            channel.due = now + self.window if channel.pending else None
+        return batches
+
+    def _next_timeout(self):
+        dues = [channel.due for channel in self._channels.values()
+                if channel.due is not None and not channel.in_flight]
+        return max(0.0, min(dues) - self.clock()) if dues else None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closing:
+                    timeout = self._next_timeout()
+                    if timeout == 0.0:
+                        break
+                    self._condition.wait(timeout)
+                if self._closing:
+                    return
+                batches = self._take_due()
+            for channel, events in batches:
+                self._dispatch(channel, events)
+
+    def _dispatch(self, channel, events, final=False):
+        """把一批事件合成汇总消息交给调度器，送达结果由回执回调处理"""
+        notifier = channel.notifier
+        if notifier.expired():
+            self._drop(events, "已超出推送有效时长")
+            return None
+        if not final and not notifier.can_send():
+            self._requeue(channel, events)
+            return None
+        with self._condition:
+            channel.in_flight += 1
+        receipt = self.dispatcher.submit(notifier, *self.digest(events))
+        receipt.add_done_callback(lambda done: self._on_finished(channel, events, done, final))
+        return receipt
+
+    def _on_finished(self, channel, events, receipt, final):
+        with self._condition:
+            channel.in_flight -= 1
+            self._condition.notify()
+        if receipt.status == DeliveryReceipt.SENT:
+            NOTIFY_EVENTS.inc(sum(event.count for _, event in events), result="delivered")
+        elif channel.notifier.expired():
+            self._drop(events, "已超出推送有效时长")
+        elif final or self._flushed:
+            self._drop(events, f"关闭时未送达（{receipt.error}）")
+        else:
+            self._requeue(channel, events)
+
+    def _requeue(self, channel, events):
+        """未送达：退回待发队列，下个窗口与新事件一起发送"""
+        with self._condition:
+            for key, event in reversed(events):
+                if key in channel.pending:
+                    self._merge(channel, key, event, older=True)
+                else:
+                    channel.pending = {key: event, **channel.pending}
+            if channel.due is None:
+                channel.due = self.clock() + self.window
+            self._condition.notify()
+
+    def _drop(self, events, reason):
+        count = sum(event.count for _, event in events)
+        NOTIFY_EVENTS.inc(count, result="dropped")
+        print(f"丢弃{count}条推送事件：{reason}")
+
+    @staticmethod
+    def digest(events):
+        """把 [(考生号, 事件), ...] 合成一条 (标题, 内容)"""
+        def note(event):
+            return f"（合并{event.count}次更新，以下为最新）\n" if event.count > 1 else ""
+
+        if len(events) == 1:
+            _, event = events[0]
+            return event.title, f"{note(event)}{event.message or ''}"
+        title = f"{events[-1][1].title or '录取通知'}（{len(events)}名考生）"
+        message = "\n\n".join(f"【{event.label}】{note(event)}{event.message or ''}" for _, event in events)
+        return title, message
+
+    def _wait_in_flight(self, deadline):
+        with self._condition:
+            while any(channel.in_flight for channel in self._channels.values()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                self._condition.wait(remaining)
+
+    def close(self, timeout=10.0):
+        """停止合并，把全部待发事件交给调度器并等待结束（须在关闭调度器之前调用）；仍未送达的计为丢弃"""
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        deadline = time.monotonic() + timeout
+        # 先等在途消息结束（失败的会退回待发队列），再一次性发出剩余事件
+        self._wait_in_flight(deadline)
+        with self._condition:
+            batches = self._take_due(flush_all=True)
+            self._flushed = True
+        for channel, events in batches:
+            # 等待推送频率限制结束后发送（最多等到 deadline）
+            while not channel.notifier.can_send() and not channel.notifier.expired() \
+                    and time.monotonic() < deadline:
+                time.sleep(0.1)
+            self._dispatch(channel, events, final=True)
+        self._wait_in_flight(deadline)
@@ -0,0 +1,237 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from Metrics import SAVE_SECONDS, timed
+from Rules import validate_rules
+
+
+# 读取配置（递归合并默认配置）
+def read_config(config_path="config.json"):
+    default_config = {
+        "ksh": "",
+        "sfzh": "",
+        "interval": 5.0,
+        "connect_timeout": 3.0,
+        "read_timeout": 10.0,
+        "deadline": 15.0,  # 单次请求（含读取响应）的总时长上限（秒），0 表示不限制
+        "endpoints": {
+            "urls": [],  # 查询地址列表（镜像或代理），为空时使用官方地址
+            "hedge": True,  # 主地址超过最近延迟 p95 仍未返回时，向次优地址发出对冲请求
+            "hedge_percentile": 95,
+            "hedge_min_delay": 0.1,  # 对冲等待时间下限（秒）
+            "max_failures": 3,  # 连续失败多少次后暂停使用该地址
+            "health_interval": 30.0  # 探测暂停地址是否恢复的间隔（秒）
+        },
+        "circuit_breaker": {
+            "enabled": True,
+            "failure_threshold": 5,  # 连续失败多少次后熔断
+            "recovery_timeout": 30.0  # 熔断多少秒后发送探测请求
+        },
+        "schedule": {
+            "max_interval": 300.0,  # 连续失败退避后的最大间隔（秒）
+            "backoff_factor": 2.0,
+            "jitter": 0.1,  # 随机抖动比例
+            "windows": []  # 时间窗口：[{"start": "08:00", "end": "12:00", "interval": 1.0}]
+        },
+        "history": {
+            "enabled": True,  # 记录响应变化历史（仅内容变化时写入）
+            "path": "history.db"
+        },
+        "metrics": {
+            "port": 0,  # 本机 /metrics 导出端口，0 表示不启用
+            "summary_interval": 0  # 定期输出汇总行的间隔（秒），0 表示不输出
+        },
+        "logging": {
+            "dir": "logs",
+            "level": "ERROR",
+            "log_success": False,  # 同时记录每次成功的查询（候选人、耗时、状态码）
+            "max_bytes": 10485760,  # 单个日志文件超过该大小时轮转（另外每天午夜轮转）
+            "backup_count": 30
+        },
+        "rate_limit": {
+            "rate": 0,  # 全局每秒最大请求数，0 表示不限速
+            "burst": 1
+        },
+        "query_mode": 1,
+        "rules": [],  # 自定义推送/停止规则，为空时使用 query_mode 的内置规则（格式见 Rules.py）
+        "ignore_fields": [],  # 模式3中不参与变更比较的易变字段
+        "push": {
+            "method": "none",
+            "pushplus_token": "",
+            "serverchan_token": ""
+        },
+        "coalesce": {
+            "window": 10.0,  # 推送合并窗口（秒），窗口内的推送事件合并为一条汇总消息；0 表示不合并
+            "max_candidates": 20  # 一条汇总消息最多包含的考生数
+        },
+        "candidates": []  # 多考生列表：[{"ksh": ..., "sfzh": ..., "query_mode": ...}]
+    }
+
+    # 递归合并配置（补充缺失键，不覆盖已有键）
+    def merge_dict(target, source):
+        for k, v in source.items():
+            if isinstance(v, dict) and k in target and isinstance(target[k], dict):
+                merge_dict(target[k], v)
+            else:
+                target.setdefault(k, v)
+
+    if not os.path.exists(config_path):
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(default_config, f, ensure_ascii=False, indent=4)
+        return default_config
+
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        merge_dict(config, default_config)
+    except Exception as e:
+        print(f"配置文件错误，使用默认配置: {e}")
+        return default_config
+    report_invalid_rules(config)
+    return config
+
+
+# 检查配置（及各考生）中的自定义规则，无效时提示并说明将使用内置规则
+def report_invalid_rules(config):
+    sources = [("rules", config.get('rules'))]
+    sources += [(f"考生 {entry.get('ksh')} 的 rules", entry.get('rules'))
+                for entry in config.get('candidates') or [] if isinstance(entry, dict)]
+    valid = True
+    for label, rules in sources:
+        errors = validate_rules(rules)
+        for error in errors:
+            print(f"配置中的 {label} 无效：{error}")
+        if errors:
+            print(f"{label} 将被忽略，改用查询模式对应的内置规则")
+            valid = False
+    return valid
+
+
+# 环境变量覆盖（无界面部署时使用）：变量名 -> (配置路径, 类型)
+ENV_OVERRIDES = {
+    "XMUT_KSH": (("ksh",), str),
+    "XMUT_SFZH": (("sfzh",), str),
+    "XMUT_INTERVAL": (("interval",), float),
+    "XMUT_QUERY_MODE": (("query_mode",), int),
+    "XMUT_PUSH_METHOD": (("push", "method"), str),
+    "XMUT_PUSHPLUS_TOKEN": (("push", "pushplus_token"), str),
+    "XMUT_SERVERCHAN_TOKEN": (("push", "serverchan_token"), str),
+}
+
+
+# 用环境变量覆盖配置项，返回被覆盖的变量名列表
+def apply_env_overrides(config, environ=None):
+    environ = os.environ if environ is None else environ
+    applied = []
+    for name, (path, cast) in ENV_OVERRIDES.items():
+        value = environ.get(name)
+        if value is None or value == "":
+            continue
+        target = config
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = cast(value)
+        applied.append(name)
+    return applied
+
+
+# 原子写入JSON：先写临时文件再替换，避免写入中途崩溃损坏原文件
+def write_json_atomic(path, data, indent=None):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# 保存配置
+@timed(SAVE_SECONDS)
+def save_config(config, config_path="config.json"):
+    try:
+        write_json_atomic(config_path, config, indent=4)
+        return True
+    except Exception as e:
+        print(f"配置保存失败: {e}")
+        return False
+
+
+class StateStore:
+    """查询状态存储：与用户配置分离，仅在内容变化时合并写盘"""
+
+    def __init__(self, path="state.json", debounce_seconds=2.0):
+        """
+        :param path: 状态文件路径
+        :param debounce_seconds: 两次写盘之间的最小间隔（秒），期间的变化合并为一次写入
+        """
+        self.path = path
+        self.debounce_seconds = debounce_seconds
+        self._data = self._load()
+        self._dirty = False
+        self._last_write = 0.0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"状态文件错误，已忽略: {e}")
+            return {}
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def set(self, key, value):
+        """更新状态，内容未变化时直接返回 False，不产生任何写盘"""
+        with self._lock:
+            if key in self._data and self._data[key] == value:
+                return False
+            self._data[key] = value
+            self._dirty = True
+            self._schedule_flush()
+        return True
+
+    def _schedule_flush(self):
+        if self._timer is not None:
+            return
+        delay = self._last_write + self.debounce_seconds - time.monotonic()
+        if delay <= 0:
+            self._write()
+            return
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _write(self):
+        try:
+            with SAVE_SECONDS.time():
+                write_json_atomic(self.path, self._data)
+            self._dirty = False
+        except Exception as e:
+            print(f"状态保存失败: {e}")
+        self._last_write = time.monotonic()
+
+    def flush(self):
+        """立即写入尚未落盘的变化"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._dirty:
+                self._write()
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,84 @@
+import argparse
+import signal
+import sys
+
+from Config import apply_env_overrides, read_config
+from Engine import build_engine, run_engine
+from Logs import QueuedLogging
+from Metrics import MetricsExporter
+from Pool import WorkerPool
+from Push import close_clients
+
+
+# 解析命令行参数
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="厦门理工学院录取查询（无界面模式）")
+    parser.add_argument("--config", default="config.json", help="配置文件路径（默认 config.json）")
+    parser.add_argument("--state", default="state.json", help="查询状态文件路径（默认 state.json）")
+    parser.add_argument("--interval", type=float, help="覆盖配置中的查询间隔（秒）")
+    parser.add_argument("--max-concurrency", type=int, default=50, help="同时在途的最大请求数（多进程时为每个进程）")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="工作进程数，大于1时按一致性哈希把 candidates 分给多个进程查询")
+    return parser.parse_args(argv)
+
+
+# 配置日志：文本输出到标准错误交由 systemd/journald 收集，同时写入轮转的 JSON 日志文件
+def setup_logger(config):
+    return QueuedLogging.from_config(config, "xmut.daemon", console=True, level="INFO")
+
+
+# 注册停止信号：SIGTERM（systemd stop）与 SIGINT（Ctrl+C），runner 为查询引擎或多进程工作池
+def install_signal_handlers(runner, logger):
+    def handle_signal(signum, frame):
+        logger.info(f"收到信号 {signal.Signals(signum).name}，正在停止...")
+        runner.stop()
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, handle_signal)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = read_config(args.config)
+    applied = apply_env_overrides(config)
+    logging_service = setup_logger(config)
+    logger = logging_service.logger
+    try:
+        if applied:
+            logger.info(f"已应用环境变量：{', '.join(applied)}")
+        if args.interval:
+            config['interval'] = args.interval
+
+        if args.workers > 1 and config.get('candidates'):
+            pool = WorkerPool(config, args.workers, args.max_concurrency, args.state, logger)
+            install_signal_handlers(pool, logger)
+            exporter = MetricsExporter(config, output=logger.info)
+            try:
+                pool.run()
+            finally:
+                exporter.close()
+            logger.info("查询已停止")
+            return 0
+        if args.workers > 1:
+            logger.info("未配置 candidates，忽略 --workers，使用单进程查询")
+
+        engine = build_engine(config, logger, args.max_concurrency, args.state)
+        if engine is None:
+            logger.error("未配置考生信息：请在配置文件中填写 ksh/sfzh 或 candidates，或设置 XMUT_KSH/XMUT_SFZH")
+            return 2
+
+        install_signal_handlers(engine, logger)
+        exporter = MetricsExporter(config, output=logger.info)
+        try:
+            run_engine(config, engine)
+        finally:
+            exporter.close()
+        logger.info("查询已停止")
+        return 0
+    finally:
+        close_clients()
+        logging_service.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
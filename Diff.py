@@ -0,0 +1,175 @@
+import hashlib
+import json
+import sys
+
+# 精简记录中保留的 tdd 字段（录取学院、专业、通知书编号、EMS单号）
+SUMMARY_FIELDS = ("xy", "result", "tzsbh", "dh")
+
+# 变更内容中未保留旧值的字段显示的旧值
+UNRECORDED = "（未记录）"
+
+_key_tuples = {}  # 字段名元组 -> 同一元组对象（字段相同的响应共享，不随考生数增长）
+
+
+# 提取参与比较的字段：tdd 中的全部字段（或 only 指定的字段）+ 顶层 ok 标志
+def tracked_fields(response_json, ignore_fields=(), only=None):
+    if not response_json:
+        return {}
+    tdd = response_json.get("tdd") or {}
+    if only is None:
+        fields = dict(tdd)
+    else:
+        fields = {key: tdd[key] for key in only if key in tdd}
+    fields["ok"] = response_json.get("ok")
+    for key in ignore_fields:
+        fields.pop(key, None)
+    return fields
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+# 精简记录需保留的 tdd 字段：SUMMARY_FIELDS + 规则需要上次值的其他字段（同一组字段共享同一元组）
+def summary_fields(extra_fields=()):
+    fields = SUMMARY_FIELDS + tuple(key for key in extra_fields if key not in SUMMARY_FIELDS)
+    return _key_tuples.setdefault(fields, fields)
+
+
+class ResponseSummary:
+    """响应的精简记录：只保留 ok 与 SUMMARY_FIELDS，字符串值驻留（大量考生共享相同的学院、专业名）
+
+    规则需要其他字段的上次值（became / no_longer_equals）时，这些字段另存于 extra；
+    提供与响应字典相同的 get("ok") / get("tdd") 接口，可直接作为 last_response 使用。
+    """
+
+    __slots__ = ("ok", "extra") + SUMMARY_FIELDS
+
+    def __init__(self, ok=None, extra_fields=(), **tdd):
+        self.ok = ok
+        for key in SUMMARY_FIELDS:
+            setattr(self, key, _intern(tdd.get(key)))
+        extra = {key: _intern(tdd[key]) for key in extra_fields if key not in SUMMARY_FIELDS and key in tdd}
+        self.extra = extra or None  # 多数考生没有额外字段，不占用字典
+
+    @classmethod
+    def from_response(cls, response_json, extra_fields=()):
+        """由响应字典（或已是精简记录）创建，空值返回 None
+
+        :param extra_fields: 除 SUMMARY_FIELDS 外还需保留的 tdd 字段（RuleSet.history_fields）
+        """
+        if response_json is None or isinstance(response_json, cls):
+            return response_json
+        return cls(response_json.get("ok"), extra_fields, **(response_json.get("tdd") or {}))
+
+    def get(self, key, default=None):
+        if key == "ok":
+            return self.ok
+        if key == "tdd":
+            tdd = {field: getattr(self, field) for field in SUMMARY_FIELDS if getattr(self, field) is not None}
+            if self.extra:
+                tdd.update(self.extra)
+            return tdd
+        return default
+
+    def to_dict(self):
+        """转为可写入状态文件的字典"""
+        return {"ok": self.ok, "tdd": self.get("tdd")}
+
+    def __eq__(self, other):
+        if isinstance(other, ResponseSummary):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self):
+        return f"ResponseSummary({self.to_dict()!r})"
+
+
+# 计算字段的紧凑指纹（键排序后序列化再取摘要）
+def fingerprint(fields):
+    payload = json.dumps(fields, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+# 原始响应体摘要：与上次相同时可跳过 JSON 解析与后续处理
+def body_digest(content):
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+# 逐字段的紧凑签名：(排序后的字段名元组, 各字段值 4 字节摘要拼接)，用于不保存字段值也能找出变化的字段
+def field_signature(fields):
+    keys = tuple(sorted(fields))
+    keys = _key_tuples.setdefault(keys, keys)
+    digests = b"".join(
+        hashlib.blake2b(json.dumps(fields[key], ensure_ascii=False, sort_keys=True).encode('utf-8'),
+                        digest_size=4).digest()
+        for key in keys
+    )
+    return keys, digests
+
+
+# 比较两个字段签名，返回值有变化（或新增、删除）的字段名
+def changed_keys(old_signature, new_signature):
+    def by_key(signature):
+        keys, digests = signature
+        return {key: digests[index * 4:index * 4 + 4] for index, key in enumerate(keys)}
+
+    old, new = by_key(old_signature), by_key(new_signature)
+    return [key for key in sorted(old.keys() | new.keys()) if old.get(key) != new.get(key)]
+
+
+# 逐字段比较，返回 [(字段, 旧值, 新值), ...]
+def diff_fields(old_fields, new_fields):
+    changes = []
+    for key in sorted(old_fields.keys() | new_fields.keys()):
+        old_value = old_fields.get(key)
+        new_value = new_fields.get(key)
+        if old_value != new_value:
+            changes.append((key, old_value, new_value))
+    return changes
+
+
+class ResponseDiffer:
+    """响应差异比较器：保存上次结果的指纹，未变化时只需一次摘要比较"""
+
+    __slots__ = ("ignore_fields", "kept_fields", "last_fingerprint", "last_signature")
+
+    def __init__(self, ignore_fields=(), kept_fields=None):
+        """
+        :param ignore_fields: 不参与比较的易变字段（如查询时间戳）
+        :param kept_fields: 上次结果只保留了这些 tdd 字段时传入（ResponseSummary 对应 summary_fields()）；
+            此时另存逐字段签名，其余字段的变化同样能检测到，只是变更内容中没有旧值
+        """
+        self.ignore_fields = tuple(ignore_fields or ())
+        self.kept_fields = kept_fields
+        self.last_fingerprint = None
+        self.last_signature = None
+
+    def compare(self, last_response, response_json):
+        """比较上次与本次响应，返回字段级变更列表（无变化时为空列表）"""
+        new_fields = tracked_fields(response_json, self.ignore_fields)
+        new_fingerprint = fingerprint(new_fields)
+        if self.last_fingerprint is None and last_response is not None:
+            self.last_fingerprint = fingerprint(tracked_fields(last_response, self.ignore_fields))
+
+        if new_fingerprint == self.last_fingerprint:
+            return []
+
+        self.last_fingerprint = new_fingerprint
+        if self.kept_fields is None:
+            if last_response is None:
+                return []
+            return diff_fields(tracked_fields(last_response, self.ignore_fields), new_fields)
+
+        previous, self.last_signature = self.last_signature, field_signature(new_fields)
+        if last_response is None:
+            return []
+        old_fields = tracked_fields(last_response, self.ignore_fields, self.kept_fields)
+        kept = set(self.kept_fields) | {"ok"}
+        if previous is None:
+            # 没有上次的逐字段签名（如从状态文件恢复的精简记录）：只比较保留了旧值的字段
+            return diff_fields(old_fields, {key: value for key, value in new_fields.items() if key in kept})
+        return [
+            (key, old_fields.get(key) if key in kept or key not in previous[0] else UNRECORDED, new_fields.get(key))
+            for key in changed_keys(previous, self.last_signature)
+        ]
@@ -0,0 +1,197 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+
+
+class DeliveryReceipt:
+    """推送回执：记录一次推送的状态、尝试次数与错误信息"""
+
+    PENDING = "pending"
+    SENT = "sent"
+    SKIPPED = "skipped"  # 推送器频率/时长限制拒绝发送
+    FAILED = "failed"
+
+    def __init__(self, title):
+        self.title = title
+        self.status = self.PENDING
+        self.attempts = 0
+        self.error = None
+        self.queued_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def finish(self, status, error=None):
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def add_done_callback(self, callback):
+        """推送结束时调用 callback(receipt)；已结束时立即调用"""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def wait(self, timeout=None):
+        """等待推送结束，返回是否已结束"""
+        return self._done.wait(timeout)
+
+    def __repr__(self):
+        return f"<DeliveryReceipt {self.title!r} {self.status} attempts={self.attempts}>"
+
+
+class QueuedNotifier:
+    """与 NotifierBase 接口一致的代理：send 只入队，立即返回"""
+
+    queued = True
+
+    def __init__(self, notifier, dispatcher):
+        self.notifier = notifier
+        self.dispatcher = dispatcher
+
+    def send(self, title=None, message=None):
+        receipt = self.dispatcher.submit(self.notifier, title, message)
+        return receipt.status != DeliveryReceipt.FAILED
+
+    def __getattr__(self, name):
+        return getattr(self.notifier, name)
+
+
+class NotificationDispatcher:
+    """后台推送调度器：有界队列 + 同一推送器积压消息合并发送 + 失败指数退避重试 + 关闭时清空队列"""
+
+    def __init__(self, max_queue=100, max_retries=3, base_delay=1.0, max_delay=30.0, receipt_history=200,
+                 max_batch=10):
+        """
+        :param max_queue: 等待推送的最大消息数，队列满时新消息直接记为失败
+        :param max_batch: 同一推送器积压的消息最多合并为一次推送的条数
+        :param max_retries: 首次失败后的最大重试次数
+        :param base_delay: 首次重试等待时间（秒），之后每次翻倍
+        :param max_delay: 单次重试等待时间上限（秒）
+        :param receipt_history: 保留的最近回执数量
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.receipts = deque(maxlen=receipt_history)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._held = deque()  # 合并时取出、属于其他推送器的任务，按原顺序先于队列处理
+        self._retries = []  # 待重试堆：(到期时间, 序号, 任务)
+        self._counter = itertools.count()
+        self._closing = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def wrap(self, notifier):
+        """包装推送器，为空时原样返回 None"""
+        return QueuedNotifier(notifier, self) if notifier else None
+
+    def submit(self, notifier, title=None, message=None):
+        """提交推送任务（不阻塞），返回回执"""
+        receipt = DeliveryReceipt(title or notifier.title)
+        self.receipts.append(receipt)
+        if self._closing.is_set():
+            receipt.finish(DeliveryReceipt.FAILED, "调度器已关闭")
+            return receipt
+        try:
+            self._queue.put_nowait((notifier, [(title, message)], [receipt]))
+        except queue.Full:
+            receipt.finish(DeliveryReceipt.FAILED, "推送队列已满")
+        return receipt
+
+    def _next_timeout(self):
+        if not self._retries:
+            return 0.5
+        return max(0.0, min(0.5, self._retries[0][0] - time.monotonic()))
+
+    def _run(self):
+        while True:
+            # 先处理到期的重试任务
+            while self._retries and self._retries[0][0] <= time.monotonic():
+                _, _, task = heapq.heappop(self._retries)
+                self._deliver(task)
+
+            if self._closing.is_set() and self._queue.empty() and not self._held and not self._retries:
+                break
+            if self._held:
+                task = self._held.popleft()
+            else:
+                try:
+                    task = self._queue.get(timeout=self._next_timeout())
+                except queue.Empty:
+                    continue
+            self._deliver(self._collect(task))
+
+    def _collect(self, task):
+        """把积压的、发往同一推送器的消息并入本次推送，其余任务保持原顺序留待处理"""
+        notifier, messages, receipts = task
+        if not hasattr(notifier, "send_batch"):
+            return task
+        while len(self._held) < self.max_batch:
+            try:
+                self._held.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        rest = deque()
+        for other in self._held:
+            if other[0] is notifier and len(messages) < self.max_batch:
+                messages = messages + other[1]
+                receipts = receipts + other[2]
+            else:
+                rest.append(other)
+        self._held = rest
+        return notifier, messages, receipts
+
+    def _deliver(self, task):
+        notifier, messages, receipts = task
+        for receipt in receipts:
+            receipt.attempts += 1
+        attempts = receipts[0].attempts
+        label = receipts[0].title if len(receipts) == 1 else f"{receipts[0].title} 等{len(receipts)}条"
+        try:
+            sent = notifier.send(*messages[0]) if len(messages) == 1 else notifier.send_batch(messages)
+            for receipt in receipts:
+                if sent:
+                    receipt.finish(DeliveryReceipt.SENT)
+                else:
+                    receipt.finish(DeliveryReceipt.SKIPPED, "超出推送频率或有效时长限制")
+            if sent:
+                print(f"推送成功：{label}")
+        except Exception as e:
+            if attempts > self.max_retries:
+                for receipt in receipts:
+                    receipt.finish(DeliveryReceipt.FAILED, str(e))
+                print(f"推送失败（已重试{self.max_retries}次）: {str(e)}")
+                return
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+            for receipt in receipts:
+                receipt.error = str(e)
+            heapq.heappush(self._retries, (time.monotonic() + delay, next(self._counter), task))
+
+    def close(self, timeout=10.0):
+        """停止接收新消息，等待队列与重试任务处理完毕（最多 timeout 秒）"""
+        self._closing.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        # 超时仍未送达的任务记为失败
+        for receipt in self.receipts:
+            if receipt.status == DeliveryReceipt.PENDING:
+                receipt.finish(DeliveryReceipt.FAILED, receipt.error or "关闭时未送达")
+        return list(self.receipts)
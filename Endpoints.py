@@ -0,0 +1,223 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from Metrics import HEDGES
+from Transport import QUERY_URL, QueryTransport, headers_for
+
+
+class Endpoint:
+    """单个查询地址：独立的传输层 + 最近延迟窗口 + 健康状态"""
+
+    def __init__(self, url, transport, window=50):
+        self.url = url
+        self.transport = transport
+        self.latencies = deque(maxlen=window)  # 最近成功请求的耗时（秒）
+        self.failures = 0  # 连续失败次数
+        self.healthy = True
+        self._lock = threading.Lock()
+
+    def record_success(self, seconds):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.failures = 0
+            self.healthy = True
+
+    def record_failure(self, max_failures):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= max_failures and self.healthy:
+                self.healthy = False
+                print(f"查询地址 {self.url} 连续失败{self.failures}次，暂停使用")
+
+    def mark_healthy(self):
+        with self._lock:
+            self.failures = 0
+            self.healthy = True
+
+    def percentile(self, pct):
+        """最近延迟的百分位数（最近秩法），没有样本时返回 None"""
+        with self._lock:
+            values = sorted(self.latencies)
+        if not values:
+            return None
+        return values[max(0, min(len(values) - 1, int(len(values) * pct / 100.0 + 0.5) - 1))]
+
+    @property
+    def score(self):
+        """排序依据：最近延迟中位数加连续失败惩罚，越小越优先；没有样本时为 0（优先探索）"""
+        median = self.percentile(50)
+        return (median or 0.0) + self.failures
+
+
+class EndpointPool:
+    """多查询地址传输层：按最近延迟排序，主地址慢于 p95 阈值时发出对冲请求，失败时切换到下一个地址
+
+    与 QueryTransport 接口一致（post / close），可直接传给 fetch_data。
+    """
+
+    def __init__(self, urls, connect_timeout=3.0, read_timeout=10.0, pool_size=10, deadline=None, hedge=True,
+                 hedge_percentile=95, hedge_min_delay=0.1, hedge_default_delay=1.0, max_failures=3,
+                 health_interval=30.0):
+        """
+        :param urls: 查询地址列表，靠前的地址在没有延迟数据时优先
+        :param hedge: 是否启用对冲请求
+        :param hedge_percentile: 主地址超过其最近延迟的该百分位数仍未返回时发出对冲请求
+        :param hedge_min_delay: 对冲等待时间下限（秒），避免延迟很低时几乎每次都对冲
+        :param hedge_default_delay: 延迟样本不足时的对冲等待时间（秒）
+        :param max_failures: 连续失败多少次后暂停使用该地址，由健康检查恢复
+        :param health_interval: 健康检查间隔（秒），0 表示不检查（所有地址都不可用时仍会全部尝试）
+        """
+        self.endpoints = [
+            Endpoint(url, QueryTransport(url, headers_for(url), connect_timeout, read_timeout, pool_size, deadline))
+            for url in urls
+        ]
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.max_failures = max_failures
+        self.health_interval = health_interval
+        self._executor = ThreadPoolExecutor(max_workers=pool_size * 2, thread_name_prefix="query-hedge")
+        self._closed = threading.Event()
+        self._health_thread = None
+        if health_interval > 0:
+            self._health_thread = threading.Thread(target=self._health_loop, name="endpoint-health", daemon=True)
+            self._health_thread.start()
+
+    @property
+    def url(self):
+        return self.ranked()[0].url
+
+    def ranked(self):
+        """可用地址按得分排序；全部不可用时按配置顺序返回全部地址"""
+        healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+        return sorted(healthy, key=lambda endpoint: endpoint.score) if healthy else list(self.endpoints)
+
+    def hedge_delay(self, endpoint):
+        """对冲等待时间：主地址最近延迟的 p95（样本不足时取默认值），不低于下限"""
+        if len(endpoint.latencies) < 10:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, endpoint.percentile(self.hedge_percentile))
+
+    def _attempt(self, endpoint, data):
+        started = time.monotonic()
+        try:
+            response = endpoint.transport.post(data)
+        except requests.exceptions.RequestException:
+            endpoint.record_failure(self.max_failures)
+            raise
+        if response.status_code >= 500:
+            endpoint.record_failure(self.max_failures)
+        else:
+            endpoint.record_success(time.monotonic() - started)
+        return response
+
+    def post(self, data):
+        """发送查询请求，返回最先成功的响应；全部失败时返回最后的 5xx 响应或抛出最后的异常"""
+        ranked = self.ranked()
+        if self.hedge and len(ranked) > 1:
+            return self._hedged(ranked, data)
+        return self._failover(ranked, data)
+
+    def _failover(self, endpoints, data, last_response=None, last_error=None):
+        for endpoint in endpoints:
+            try:
+                response = self._attempt(endpoint, data)
+            except requests.exceptions.RequestException as e:
+                last_error = e
+                continue
+            if response.status_code < 500:
+                return response
+            last_response = response
+        if last_response is not None:
+            return last_response
+        raise last_error
+
+    def _hedged(self, ranked, data):
+        primary, backup = ranked[0], ranked[1]
+        futures = {self._executor.submit(self._attempt, primary, data): primary}
+        done, _ = wait(futures, timeout=self.hedge_delay(primary))
+        hedged = not done
+        if hedged:
+            HEDGES.inc(result="fired")
+            futures[self._executor.submit(self._attempt, backup, data)] = backup
+
+        pending = set(futures)
+        last_response = last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as e:
+                    last_error = e
+                    continue
+                if response.status_code < 500:
+                    if hedged and futures[future] is backup:
+                        HEDGES.inc(result="won")
+                    return response
+                last_response = response
+            # 主地址在对冲前就已失败：立即切换到备用地址
+            if not pending and backup not in futures.values():
+                future = self._executor.submit(self._attempt, backup, data)
+                futures[future] = backup
+                pending = {future}
+
+        # 主备都失败时依次尝试其余地址
+        return self._failover(ranked[2:], data, last_response, last_error)
+
+    def _health_loop(self):
+        """定期探测暂停使用的地址（GET 站点首页），有响应且非 5xx 即恢复"""
+        while not self._closed.wait(self.health_interval):
+            for endpoint in self.endpoints:
+                if endpoint.healthy:
+                    continue
+                try:
+                    response = endpoint.transport.session.get(
+                        endpoint.transport.session.headers["Origin"], timeout=endpoint.transport.timeout
+                    )
+                    response.close()
+                except requests.exceptions.RequestException:
+                    continue
+                if response.status_code < 500:
+                    endpoint.mark_healthy()
+                    print(f"查询地址 {endpoint.url} 已恢复")
+
+    def close(self):
+        self._closed.set()
+        self._executor.shutdown(wait=False)
+        for endpoint in self.endpoints:
+            endpoint.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+# 按配置创建查询传输层：配置了多个查询地址时使用 EndpointPool，否则使用单地址 QueryTransport
+def create_transport(config, pool_size=10):
+    options = config.get('endpoints') or {}
+    urls = options.get('urls') or [QUERY_URL]
+    timeouts = dict(
+        connect_timeout=config.get('connect_timeout', 3.0),
+        read_timeout=config.get('read_timeout', 10.0),
+        pool_size=pool_size,
+        deadline=config.get('deadline')
+    )
+    if len(urls) == 1:
+        return QueryTransport(urls[0], headers_for(urls[0]), **timeouts)
+    return EndpointPool(
+        urls,
+        hedge=options.get('hedge', True),
+        hedge_percentile=options.get('hedge_percentile', 95),
+        hedge_min_delay=options.get('hedge_min_delay', 0.1),
+        max_failures=options.get('max_failures', 3),
+        health_interval=options.get('health_interval', 30.0),
+        **timeouts
+    )
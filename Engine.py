@@ -0,0 +1,295 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Breaker import CircuitBreaker
+from Coalesce import NotificationCoalescer
+from Config import StateStore
+from Diff import ResponseDiffer, ResponseSummary, body_digest, summary_fields
+from History import HistoryStore
+from Logs import log_poll
+from Dispatcher import NotificationDispatcher
+from Endpoints import create_transport
+from Metrics import UNCHANGED
+from Query import decode_response, fetch_data, format_partial_hide, handle_query_mode, init_notifier
+from RateLimiter import TokenBucket
+from Rules import rules_for
+from Scheduler import PollScheduler, advance_deadline
+from Transport import QueryTransport
+
+
+_mode_configs = {}  # 查询模式 -> 供 handle_query_mode 读取的配置（同模式考生共享）
+
+
+class Candidate:
+    """单个考生的查询状态（独立的 last_response 与查询模式）
+
+    使用 __slots__ 且上次结果只保留精简记录（ResponseSummary），十万级考生也只占用少量、可预估的内存；
+    规则需要上次值的字段（became / no_longer_equals）一并保留，判断结果与保存完整响应时一致。
+    """
+
+    __slots__ = ("ksh", "sfzh", "config", "rules", "last_response", "notifier", "differ", "last_digest",
+                 "scheduler", "query_count", "done")
+
+    def __init__(self, ksh, sfzh, query_mode=1, last_response=None, notifier=None, ignore_fields=(),
+                 scheduler=None, rules=None):
+        self.ksh = ksh
+        self.sfzh = sfzh
+        self.config = _mode_configs.setdefault(query_mode, {"query_mode": query_mode})
+        self.rules = rules_for({"query_mode": query_mode, "rules": rules})  # 编译后的推送/停止规则
+        self.last_response = ResponseSummary.from_response(last_response, self.rules.history_fields)
+        self.notifier = notifier
+        self.differ = ResponseDiffer(ignore_fields, summary_fields(self.rules.history_fields))
+        self.last_digest = None  # 上次已处理响应体的摘要
+        self.scheduler = scheduler  # 为空时使用引擎的固定间隔
+        self.query_count = 0
+        self.done = False  # 已检测到目标结果
+
+    @property
+    def label(self):
+        return format_partial_hide(self.ksh)
+
+    def last_response_dict(self):
+        """上次结果（写入状态文件或跨进程传递用的字典）"""
+        return self.last_response.to_dict() if self.last_response is not None else None
+
+
+# 从配置构建考生列表（candidates 为空时退化为单考生），上次结果从状态存储恢复
+# 传入 entries 时只构建这些考生（可为空，如工作进程分到的空分片），不退化为单考生
+# 传入 coalescer 时推送先经合并器按窗口合并（推送配置相同的考生共用一个渠道），再交给 dispatcher 发送
+def load_candidates(config, state=None, dispatcher=None, coalescer=None, entries=None):
+    if entries is None:
+        entries = config.get('candidates') or []
+        if not entries and config['ksh'] and config['sfzh']:
+            entries = [{
+                "ksh": config['ksh'],
+                "sfzh": config['sfzh'],
+                "last_response": config.get('last_response')
+            }]
+
+    scheduler = PollScheduler.from_config(config)
+    candidates = []
+    for entry in entries:
+        push = entry.get('push', config['push'])
+        notifier = init_notifier(push['method'], push.get('pushplus_token'), push.get('serverchan_token'))
+        if coalescer is not None:
+            channel_key = (push['method'], push.get('pushplus_token'), push.get('serverchan_token'))
+            notifier = coalescer.wrap(notifier, entry['ksh'], format_partial_hide(entry['ksh']), channel_key)
+        elif dispatcher is not None:
+            notifier = dispatcher.wrap(notifier)
+        last_response = entry.get('last_response')
+        if state is not None:
+            last_response = state.get(entry['ksh'], last_response)
+        candidates.append(Candidate(
+            ksh=entry['ksh'],
+            sfzh=entry['sfzh'].upper(),
+            query_mode=entry.get('query_mode', config['query_mode']),
+            last_response=last_response,
+            notifier=notifier,
+            ignore_fields=entry.get('ignore_fields', config.get('ignore_fields')),
+            scheduler=scheduler.spawn(),
+            rules=entry.get('rules', config.get('rules'))
+        ))
+    return candidates
+
+
+class QueryEngine:
+    """基于 asyncio 的多考生并发查询引擎"""
+
+    def __init__(self, candidates, interval=5.0, transport=None, max_concurrency=50, logger=None, limiter=None,
+                 state=None, dispatcher=None, history=None, breaker=None, on_result=None, persistent=False,
+                 coalescer=None):
+        """
+        :param candidates: Candidate 列表
+        :param interval: 考生未配置调度器时使用的固定查询间隔（秒）
+        :param transport: 共享的查询传输层（为空时按并发数新建）
+        :param max_concurrency: 同时在途的最大请求数
+        :param limiter: 全局令牌桶限速器（为空时不限速）
+        :param state: 状态存储（为空时不持久化）
+        :param dispatcher: 后台推送调度器（关闭引擎时一并清空）
+        :param coalescer: 推送合并器（关闭引擎时发送剩余的待发事件）
+        :param history: 响应历史存储（为空时不记录）
+        :param breaker: 所有考生共享的查询接口熔断器
+        :param on_result: 每次成功处理响应后的回调 on_result(candidate, response_json)（在线程池中调用）
+        :param persistent: 为 True 时全部考生完成后仍继续运行，等待 add_candidate() 或 stop()
+        """
+        self.candidates = candidates
+        self.interval = interval
+        self.max_concurrency = max_concurrency
+        self.transport = transport or QueryTransport(pool_size=max_concurrency)
+        self.logger = logger
+        self.limiter = limiter
+        self.state = state
+        self.dispatcher = dispatcher
+        self.coalescer = coalescer
+        self.history = history
+        self.breaker = breaker
+        self.on_result = on_result
+        self.persistent = persistent
+        self._tasks = set()
+        self._semaphore = None
+        self._executor = None
+        self._stop_event = None
+        self._stop_requested = False  # run() 启动前收到的停止请求
+        self._loop = None
+
+    async def run(self):
+        """并发轮询全部考生，直到全部完成或调用 stop()"""
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        if self._stop_requested:
+            self._stop_event.set()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        count = len(self.candidates)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            self._executor = executor
+            # 启动时间均匀错开，避免所有考生同时发起请求
+            for index, candidate in enumerate(self.candidates):
+                self._start_candidate(candidate, index * self.interval / count)
+            while self._tasks or (self.persistent and not self.stopped):
+                if self._tasks:
+                    await asyncio.wait(set(self._tasks))
+                else:
+                    await self._stop_event.wait()
+
+    def _start_candidate(self, candidate, offset=0.0):
+        task = asyncio.ensure_future(self._poll_loop(candidate, offset, self._semaphore, self._executor))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def add_candidate(self, candidate):
+        """运行中追加考生（可在其他线程调用）"""
+        self.candidates.append(candidate)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._start_candidate, candidate)
+
+    def stop(self):
+        """请求停止（可在其他线程或信号处理函数中调用）"""
+        self._stop_requested = True
+        if self._loop is not None and self._stop_event is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+    @property
+    def stopped(self):
+        return self._stop_event is not None and self._stop_event.is_set()
+
+    async def _wait(self, seconds):
+        """可被 stop() 打断的等待"""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _poll_loop(self, candidate, offset, semaphore, executor):
+        # 按绝对时间点（monotonic）排期，查询与排队耗时不会使实际间隔变长
+        deadline = time.monotonic() + offset
+        await self._wait(offset)
+        while not candidate.done and not self.stopped:
+            async with semaphore:
+                await self.query_once(candidate, executor)
+            if candidate.done:
+                break
+            delay = candidate.scheduler.next_delay() if candidate.scheduler else self.interval
+            deadline = advance_deadline(deadline, delay)
+            await self._wait(max(0.0, deadline - time.monotonic()))
+
+    async def query_once(self, candidate, executor=None):
+        """对单个考生执行一次 查询 → 模式判断 → 推送"""
+        loop = asyncio.get_running_loop()
+        if self.limiter is not None:
+            await self.limiter.acquire_async()
+            if self.stopped:
+                return
+        candidate.query_count += 1
+        current_time = time.strftime("%H:%M:%S")
+        started = time.monotonic()
+        try:
+            response = await loop.run_in_executor(
+                executor, fetch_data, candidate.ksh, candidate.sfzh, self.transport, None, self.breaker
+            )
+            print(f"[{current_time}] {candidate.label} 第{candidate.query_count}次查询 - 状态码：{response.status_code}")
+            # 模式判断中可能同步推送，放到线程池中避免阻塞事件循环
+            await loop.run_in_executor(executor, self._process, candidate, response, current_time)
+            log_poll(self.logger, candidate.label, response.status_code, started, candidate.query_count)
+        except Exception as e:
+            if candidate.scheduler:
+                candidate.scheduler.record_failure()
+            print(f"{candidate.label} 查询失败: {str(e)}")
+            log_poll(self.logger, candidate.label, type(e).__name__, started, candidate.query_count, e)
+
+    def _process(self, candidate, response, current_time):
+        # 响应体与上次逐字节相同：结果不可能变化，跳过解析、模式判断与持久化
+        digest = body_digest(response.content)
+        if digest == candidate.last_digest:
+            UNCHANGED.inc()
+            if candidate.scheduler:
+                candidate.scheduler.record_success()
+            return
+        response_json = decode_response(response)
+        if self.history is not None:
+            self.history.record(candidate.ksh, response_json, candidate.query_count)
+        last_response, should_stop = handle_query_mode(
+            response_json, candidate.config, candidate.last_response, candidate.notifier, current_time,
+            candidate.differ, candidate.rules
+        )
+        candidate.last_response = ResponseSummary.from_response(last_response, candidate.rules.history_fields)
+        if self.state is not None:
+            self.state.set(candidate.ksh, candidate.last_response_dict())
+        candidate.last_digest = digest
+        if candidate.scheduler:
+            candidate.scheduler.record_success()
+        if should_stop:
+            candidate.done = True
+            print(f"{candidate.label} 查询结束（已检测到目标结果）")
+        if self.on_result is not None:
+            self.on_result(candidate, response_json)
+
+    def close(self):
+        self.transport.close()
+        if self.state is not None:
+            self.state.close()
+        if self.coalescer is not None:
+            self.coalescer.close()
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+        if self.history is not None:
+            self.history.close()
+
+
+# 按配置构建多考生查询引擎
+def build_engine(config, logger=None, max_concurrency=50, state_path="state.json"):
+    state = StateStore(state_path)
+    dispatcher = NotificationDispatcher()
+    coalescer = NotificationCoalescer.from_config(config, dispatcher)
+    candidates = load_candidates(config, state, dispatcher, coalescer)
+    if not candidates:
+        return None
+    dispatcher.start()
+    if coalescer is not None:
+        coalescer.start()
+    return QueryEngine(
+        candidates,
+        interval=config['interval'],
+        transport=create_transport(config, pool_size=max_concurrency),
+        max_concurrency=max_concurrency,
+        logger=logger,
+        limiter=TokenBucket.from_config(config),
+        state=state,
+        dispatcher=dispatcher,
+        coalescer=coalescer,
+        history=HistoryStore.from_config(config),
+        breaker=CircuitBreaker.from_config(config)
+    )
+
+
+# 多考生查询入口：运行引擎直到结束，退出前落盘状态
+def run_engine(config, engine):
+    print(f"\n===== 开始查询（共{len(engine.candidates)}名考生） =====")
+    try:
+        asyncio.run(engine.run())
+    except KeyboardInterrupt:
+        print("\n用户终止查询")
+    finally:
+        engine.close()
+    return config
@@ -0,0 +1,34 @@
+class QueryError(Exception):
+    """查询失败基类"""
+
+
+class QueryTimeoutError(QueryError):
+    """连接或读取超时，或超过单次请求的截止时间"""
+
+
+class QueryConnectionError(QueryError):
+    """连接被拒绝、重置或网络不可达"""
+
+
+class QueryHTTPError(QueryError):
+    """服务器返回非 2xx 状态码"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class QueryServerError(QueryHTTPError):
+    """服务器返回 5xx（过载或故障）"""
+
+
+class QueryDecodeError(QueryError):
+    """响应体不是有效的 JSON"""
+
+
+class CircuitOpenError(QueryError):
+    """熔断器处于打开状态，本次查询未发出"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+from Diff import fingerprint
+
+
+class HistoryStore:
+    """响应历史：只追加、按内容摘要去重的 SQLite 存储
+
+    每名考生仅在响应内容变化时写入一行（时间、查询序号、摘要、压缩后的响应体），
+    以 5 秒间隔持续轮询数周，体积也只随真实变化次数增长。
+    """
+
+    def __init__(self, path="history.db"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id INTEGER PRIMARY KEY, ksh TEXT NOT NULL, ts REAL NOT NULL, "
+            "query_count INTEGER NOT NULL, digest TEXT NOT NULL, body BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_ksh_id ON history (ksh, id)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._last_digest = {}  # 考生号 -> 最近一条记录的摘要（内存缓存）
+
+    @classmethod
+    def from_config(cls, config):
+        """按配置创建历史存储，未启用时返回 None"""
+        history = config.get('history') or {}
+        if not history.get('enabled', True):
+            return None
+        return cls(history.get('path', "history.db"))
+
+    @staticmethod
+    def _encode(response_json):
+        return zlib.compress(json.dumps(response_json, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    @staticmethod
+    def _decode(body):
+        return json.loads(zlib.decompress(body).decode('utf-8'))
+
+    def _latest_digest(self, ksh):
+        if ksh not in self._last_digest:
+            row = self._conn.execute(
+                "SELECT digest FROM history WHERE ksh = ? ORDER BY id DESC LIMIT 1", (ksh,)
+            ).fetchone()
+            self._last_digest[ksh] = row[0] if row else None
+        return self._last_digest[ksh]
+
+    def record(self, ksh, response_json, query_count, ts=None):
+        """记录一次响应；与该考生上一条记录内容相同时跳过，返回是否写入"""
+        digest = fingerprint(response_json)
+        with self._lock:
+            if self._latest_digest(ksh) == digest:
+                return False
+            self._conn.execute(
+                "INSERT INTO history (ksh, ts, query_count, digest, body) VALUES (?, ?, ?, ?, ?)",
+                (ksh, time.time() if ts is None else ts, query_count, digest, self._encode(response_json))
+            )
+            self._conn.commit()
+            self._last_digest[ksh] = digest
+        return True
+
+    def _row(self, row):
+        ksh, ts, query_count, body = row
+        return {"ksh": ksh, "ts": ts, "query_count": query_count, "response": self._decode(body)}
+
+    def latest(self, ksh):
+        """某考生最近一次记录，没有记录时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ksh, ts, query_count, body FROM history WHERE ksh = ? ORDER BY id DESC LIMIT 1", (ksh,)
+            ).fetchone()
+        return self._row(row) if row else None
+
+    def latest_all(self):
+        """全部考生的最近记录：{考生号: 记录}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ksh, ts, query_count, body FROM history "
+                "WHERE id IN (SELECT MAX(id) FROM history GROUP BY ksh)"
+            ).fetchall()
+        return {row[0]: self._row(row) for row in rows}
+
+    def iter_latest(self, batch_size=500):
+        """逐批读取全部考生的最近记录（按考生号排序），不一次性载入内存；使用独立的只读连接"""
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            cursor = conn.execute(
+                "SELECT ksh, ts, query_count, body FROM history "
+                "WHERE id IN (SELECT MAX(id) FROM history GROUP BY ksh) ORDER BY ksh"
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._row(row)
+        finally:
+            conn.close()
+
+    def scan(self, ksh, start=None, end=None):
+        """按时间范围 [start, end) 顺序返回某考生的变化记录"""
+        sql = "SELECT ksh, ts, query_count, body FROM history WHERE ksh = ?"
+        params = [ksh]
+        if start is not None:
+            sql += " AND ts >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND ts < ?"
+            params.append(end)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY id", params).fetchall()
+        return [self._row(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
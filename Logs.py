@@ -0,0 +1,158 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from datetime import datetime, timedelta
+
+# 结构化字段：通过 logger.xxx(..., extra={...}) 传入，写入 JSON 记录
+RECORD_FIELDS = ("candidate", "status", "latency_ms", "query_count")
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON：时间、级别、消息及结构化字段"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+            "level": record.levelname,
+            "message": record.getMessage()
+        }
+        for field in RECORD_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DailySizeRotatingHandler(logging.handlers.RotatingFileHandler):
+    """按午夜与文件大小双重轮转的日志文件
+
+    当前日志始终写入 query.log；跨过午夜或超过 max_bytes 时改名为 query.log.YYYYMMDD.N，
+    只保留最近 backup_count 个轮转文件。
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=30):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.day = self._today()
+        self.rollover_at = self._next_midnight()
+
+    @staticmethod
+    def _today():
+        return datetime.now().strftime('%Y%m%d')
+
+    @staticmethod
+    def _next_midnight():
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+    def shouldRollover(self, record):
+        if record.created >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            index = 1
+            while os.path.exists(f"{self.baseFilename}.{self.day}.{index}"):
+                index += 1
+            os.replace(self.baseFilename, f"{self.baseFilename}.{self.day}.{index}")
+            self._remove_old()
+        self.day = self._today()
+        self.rollover_at = self._next_midnight()
+
+    def _remove_old(self):
+        if self.backupCount <= 0:
+            return
+        directory, prefix = os.path.split(self.baseFilename)
+        rotated = [name for name in os.listdir(directory or ".") if name.startswith(prefix + ".")]
+
+        # 按（日期, 序号）排序，删除最旧的文件
+        def sort_key(name):
+            day, _, index = name[len(prefix) + 1:].partition(".")
+            return day, int(index) if index.isdigit() else 0
+
+        for name in sorted(rotated, key=sort_key)[:-self.backupCount]:
+            os.remove(os.path.join(directory, name))
+
+
+class QueuedLogging:
+    """非阻塞日志：查询线程只把记录放入队列，由后台监听线程写文件（及可选的标准错误）"""
+
+    def __init__(self, name="xmut", log_dir="logs", level="ERROR", log_success=False, max_bytes=10 * 1024 * 1024,
+                 backup_count=30, console=False):
+        """
+        :param level: 写入的最低级别（DEBUG/INFO/WARNING/ERROR）
+        :param log_success: 为 True 时同时记录每次成功的查询（INFO 级别）
+        :param max_bytes: 单个日志文件的大小上限，超过后轮转
+        :param backup_count: 保留的轮转文件数
+        :param console: 同时以文本格式输出到标准错误（无界面模式交给 journald 收集）
+        """
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = DailySizeRotatingHandler(os.path.join(log_dir, "query.log"), max_bytes, backup_count)
+        file_handler.setFormatter(JsonFormatter())
+        handlers = [file_handler]
+        if console:
+            console_handler = logging.StreamHandler(sys.stderr)
+            console_handler.setFormatter(logging.Formatter(
+                '%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S'
+            ))
+            handlers.append(console_handler)
+
+        self._queue = queue.SimpleQueue()
+        self.listener = logging.handlers.QueueListener(self._queue, *handlers)
+        self.listener.start()
+
+        self.logger = logging.getLogger(name)
+        self.logger.handlers.clear()
+        self.logger.addHandler(logging.handlers.QueueHandler(self._queue))
+        self.logger.propagate = False
+        level = logging.getLevelName(str(level).upper())
+        if not isinstance(level, int):
+            level = logging.ERROR
+        self.logger.setLevel(min(level, logging.INFO) if log_success else level)
+        self.logger.filters.clear()
+        if not log_success:
+            self.logger.addFilter(lambda record: not getattr(record, "poll_success", False))
+
+    @classmethod
+    def from_config(cls, config, name="xmut", console=False, level=None):
+        """按配置创建；level 非空时覆盖配置中的级别"""
+        options = config.get('logging') or {}
+        return cls(
+            name=name,
+            log_dir=options.get('dir', "logs"),
+            level=level or options.get('level', "ERROR"),
+            log_success=options.get('log_success', False),
+            max_bytes=options.get('max_bytes', 10 * 1024 * 1024),
+            backup_count=options.get('backup_count', 30),
+            console=console
+        )
+
+    def close(self):
+        """写完队列中剩余的记录后停止监听线程"""
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+
+# 记录一次查询结果；成功记录为 INFO，仅在开启 log_success 时写入
+def log_poll(logger, candidate, status, started, query_count=None, error=None):
+    level = logging.ERROR if error is not None else logging.INFO
+    if logger is None or not logger.isEnabledFor(level):
+        return
+    message = f"{candidate} 查询失败: {error}" if error is not None else f"{candidate} 查询成功"
+    logger.log(level, message, extra={
+        "candidate": candidate,
+        "status": status,
+        "latency_ms": round((time.monotonic() - started) * 1000, 1),
+        "query_count": query_count,
+        "poll_success": error is None
+    })
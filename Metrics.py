@@ -0,0 +1,287 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# 默认延迟分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# 标签字典转为 Prometheus 文本格式：{k="v",...}
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Counter:
+    """单调递增计数器，支持标签"""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def total(self):
+        return sum(self._values.values())
+
+    def drain(self):
+        """取出自上次取出以来的增量并清零，没有增量时返回 None"""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values or None
+
+    def merge(self, values):
+        """并入 drain() 取出的增量"""
+        with self._lock:
+            for key, amount in values.items():
+                self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items()) or [((), 0)]
+        lines += [f"{self.name}{_format_labels(labels)} {value}" for labels, value in items]
+        return lines
+
+
+class Histogram:
+    """延迟直方图：固定分桶计数 + 总和"""
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[index] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        """计时上下文：with histogram.time(): ..."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def drain(self):
+        """取出自上次取出以来的增量 (分桶计数, 次数, 总和) 并清零，没有增量时返回 None"""
+        with self._lock:
+            if not self.count:
+                return None
+            delta = (self._counts, self.count, self.sum)
+            self._counts, self.count, self.sum = [0] * len(self.buckets), 0, 0.0
+        return delta
+
+    def merge(self, delta):
+        """并入 drain() 取出的增量"""
+        counts, count, total = delta
+        with self._lock:
+            self._counts = [mine + theirs for mine, theirs in zip(self._counts, counts)]
+            self.count += count
+            self.sum += total
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            cumulative = 0
+            for bound, count in zip(self.buckets, self._counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+            lines.append(f"{self.name}_sum {self.sum}")
+            lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class Registry:
+    """指标注册表：按名称复用指标，统一导出"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, *args):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, help_text, *args)
+            return self._metrics[name]
+
+    def counter(self, name, help_text=""):
+        return self._get_or_create(Counter, name, help_text)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, buckets)
+
+    def drain(self):
+        """取出全部指标的增量并清零：{名称: (类型, 分桶, 增量)}，供工作进程回传给协调进程"""
+        deltas = {}
+        for metric in list(self._metrics.values()):
+            delta = metric.drain()
+            if delta is not None:
+                kind = "histogram" if isinstance(metric, Histogram) else "counter"
+                deltas[metric.name] = (kind, getattr(metric, "buckets", None), delta)
+        return deltas
+
+    def merge(self, deltas):
+        """并入其他进程 drain() 取出的增量"""
+        for name, (kind, buckets, delta) in deltas.items():
+            metric = self.histogram(name, "", buckets) if kind == "histogram" else self.counter(name)
+            metric.merge(delta)
+
+    def render(self):
+        """导出 Prometheus 文本格式"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+# 全局注册表与热点路径上的指标
+REGISTRY = Registry()
+REQUESTS = REGISTRY.counter("xmut_query_requests_total", "查询请求次数")
+REQUEST_ERRORS = REGISTRY.counter("xmut_query_errors_total", "查询失败次数（按错误类型）")
+FETCH_SECONDS = REGISTRY.histogram("xmut_fetch_seconds", "fetch_data 耗时")
+DECODE_SECONDS = REGISTRY.histogram("xmut_json_decode_seconds", "响应 JSON 解析耗时")
+HANDLE_SECONDS = REGISTRY.histogram("xmut_handle_query_mode_seconds", "handle_query_mode 耗时")
+SAVE_SECONDS = REGISTRY.histogram("xmut_save_seconds", "配置/状态写盘耗时")
+PUSH_SECONDS = REGISTRY.histogram("xmut_push_seconds", "send_message 推送耗时")
+PUSHES = REGISTRY.counter("xmut_pushes_total", "推送次数（按结果）")
+HEDGES = REGISTRY.counter("xmut_hedged_requests_total", "对冲请求次数（fired：发出对冲，won：对冲请求先返回）")
+UNCHANGED = REGISTRY.counter("xmut_unchanged_responses_total", "响应体与上次完全相同、跳过解析的次数")
+NOTIFY_EVENTS = REGISTRY.counter(
+    "xmut_notification_events_total",
+    "推送事件数（received：产生，delivered：已送达，dropped：超出有效时长或关闭时未送达；"
+    "merged：与同一考生待发事件合并的次数，合并的事件仍计入送达或丢弃）"
+)
+
+
+# 装饰器：记录函数耗时到直方图
+def timed(histogram):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time():
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# 创建 /metrics 请求处理类（首次启用导出时才导入 http.server，单次检查等入口无需加载）
+@functools.lru_cache(maxsize=None)
+def _metrics_handler():
+    from http.server import BaseHTTPRequestHandler
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = self.server.registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return _MetricsHandler
+
+
+class MetricsServer:
+    """本机 /metrics 导出接口（仅监听 127.0.0.1）"""
+
+    def __init__(self, port, registry=REGISTRY, host="127.0.0.1"):
+        from http.server import ThreadingHTTPServer
+
+        self.registry = registry
+        self._server = ThreadingHTTPServer((host, port), _metrics_handler())
+        self._server.daemon_threads = True
+        self._server.registry = registry
+
+    @property
+    def server_address(self):
+        return self._server.server_address
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# 生成一行汇总信息
+def summary_line():
+    return (
+        f"[指标] 请求 {REQUESTS.total()} 次，失败 {REQUEST_ERRORS.total()} 次，"
+        f"无变化 {UNCHANGED.total()} 次，查询平均 {FETCH_SECONDS.mean * 1000:.1f}ms，"
+        f"推送成功 {PUSHES.get(result='sent')} / 失败 {PUSHES.get(result='failed')}，"
+        f"推送事件合并 {NOTIFY_EVENTS.get(result='merged')} / 丢弃 {NOTIFY_EVENTS.get(result='dropped')}"
+    )
+
+
+class SummaryReporter:
+    """定期输出汇总行"""
+
+    def __init__(self, interval, output=print):
+        self.interval = interval
+        self.output = output
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-summary", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.output(summary_line())
+
+    def close(self):
+        self._stop_event.set()
+
+
+class MetricsExporter:
+    """按配置启动 /metrics 接口与定期汇总，统一关闭"""
+
+    def __init__(self, config, output=print):
+        metrics = config.get('metrics') or {}
+        port = metrics.get('port', 0)
+        interval = metrics.get('summary_interval', 0)
+        self.server = MetricsServer(port).start() if port else None
+        self.reporter = SummaryReporter(interval, output).start() if interval else None
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        if self.reporter is not None:
+            self.reporter.close()
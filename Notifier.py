@@ -1,23 +1,37 @@
+import functools
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from Metrics import PUSH_SECONDS, PUSHES
 
 
 class NotifierBase:
     """推送通知基类，定义通用逻辑，具体推送由子类实现"""
 
-    def __init__(self, title, content, interval_seconds=10, duration_minutes=10):
-        """初始化推送参数"""
+    name = "推送"
+
+    def __init__(self, title, content, interval_seconds=10, duration_minutes=10, clock=time.time):
+        """初始化推送参数；clock 为取当前时间戳的函数（离线回放时传入虚拟时钟）"""
         self.title = title
         self.content = content
         self.interval_seconds = interval_seconds
         self.duration_minutes = duration_minutes
+        self.clock = clock
         self.last_sent_time = 0  # 上次推送时间（时间戳）
-        self.start_time = time.time()  # 推送功能启动时间
+        self.start_time = clock()  # 本轮推送开始时间（启动时或上一轮结束后的第一条事件）
+
+    def expired(self):
+        """是否已超出本轮推送有效时长（在下一条事件到来前不会再推送）"""
+        return self.clock() - self.start_time > self.duration_minutes * 60
+
+    def start_episode(self):
+        """新的推送事件到来时调用：本轮有效时长已结束时从现在开始新一轮，长时间运行时后来的事件不会被丢弃"""
+        if self.expired():
+            self.start_time = self.clock()
 
     def can_send(self):
         """判断是否可以推送（控制频率和有效时长）"""
-        current_time = time.time()
-        return (current_time - self.last_sent_time >= self.interval_seconds and
-                current_time - self.start_time <= self.duration_minutes * 60)
+        return self.clock() - self.last_sent_time >= self.interval_seconds and not self.expired()
 
     def send(self, title=None, message=None):
         """对外接口：发送推送（自动检查是否符合推送条件）"""
@@ -25,11 +39,93 @@ class NotifierBase:
         message = message or self.content
 
         if self.can_send():
-            self.send_message(title, message)
-            self.last_sent_time = time.time()
+            try:
+                with PUSH_SECONDS.time():
+                    self.send_message(title, message)
+            except Exception:
+                PUSHES.inc(result="failed")
+                raise
+            PUSHES.inc(result="sent")
+            self.last_sent_time = self.clock()
             return True
+        PUSHES.inc(result="skipped")
         return False
 
+    def send_batch(self, messages):
+        """合并推送：把多条 (标题, 内容) 合成一条消息，只发一次请求"""
+        if len(messages) == 1:
+            return self.send(*messages[0])
+        title = f"{messages[-1][0] or self.title}（共{len(messages)}条）"
+        message = "\n\n".join(f"{item_title or self.title}\n{item_message or self.content}"
+                              for item_title, item_message in messages)
+        return self.send(title, message)
+
     def send_message(self, title, message):
         """抽象方法：具体推送逻辑由子类实现"""
         raise NotImplementedError("子类必须实现 send_message 方法")
+
+
+# 记录单个渠道的发送结果
+def _store_outcome(results, name, future):
+    try:
+        results[name] = "sent" if future.result() else "skipped"
+    except Exception as e:
+        results[name] = str(e)
+
+
+class CompositeNotifier(NotifierBase):
+    """多渠道并行推送：同一消息同时发往多个渠道，任一渠道成功即返回
+
+    每个渠道保留各自的 can_send 频率与有效时长限制；
+    返回后仍在发送中的渠道继续在后台完成，结果记录在 last_results 中。
+    """
+
+    name = "多渠道"
+
+    def __init__(self, notifiers, title, content, interval_seconds=0, duration_minutes=10):
+        super().__init__(title, content, interval_seconds, duration_minutes)
+        self.notifiers = list(notifiers)
+        self.last_results = {}
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.notifiers)), thread_name_prefix="push")
+
+    def expired(self):
+        return all(notifier.expired() for notifier in self.notifiers)
+
+    def start_episode(self):
+        super().start_episode()
+        for notifier in self.notifiers:
+            notifier.start_episode()
+
+    def can_send(self):
+        return any(notifier.can_send() for notifier in self.notifiers)
+
+    def fan_out(self, title=None, message=None):
+        """并行发送，返回 (是否有渠道成功, {渠道名: "sent" / "skipped" / "pending" / 错误信息})"""
+        title = title or self.title
+        message = message or self.content
+        results = {notifier.name: "pending" for notifier in self.notifiers}
+        self.last_results = results
+        futures = {self._executor.submit(notifier.send, title, message): notifier for notifier in self.notifiers}
+
+        pending = set(futures)
+        succeeded = False
+        while pending and not succeeded:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                _store_outcome(results, futures[future].name, future)
+                succeeded = succeeded or results[futures[future].name] == "sent"
+
+        # 未完成的渠道在后台继续发送，完成后更新结果
+        for future in pending:
+            future.add_done_callback(functools.partial(_store_outcome, results, futures[future].name))
+        return succeeded, results
+
+    def send(self, title=None, message=None):
+        succeeded, results = self.fan_out(title, message)
+        if succeeded:
+            self.last_sent_time = self.clock()
+            return True
+        errors = [f"{name}：{result}" for name, result in results.items() if result not in ("skipped", "pending")]
+        if errors:
+            raise Exception("；".join(errors))
+        return False
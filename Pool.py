@@ -0,0 +1,326 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+
+from Config import StateStore
+from Coalesce import NotificationCoalescer
+from Diff import fingerprint
+from Dispatcher import NotificationDispatcher
+from Endpoints import create_transport
+from Engine import QueryEngine, load_candidates
+from History import HistoryStore
+from Metrics import REGISTRY
+from Push import close_clients
+from RateLimiter import TokenBucket
+from Breaker import CircuitBreaker
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """一致性哈希环：节点增减时只有少量考生需要迁移"""
+
+    def __init__(self, nodes=(), replicas=64):
+        """
+        :param nodes: 初始节点（工作进程编号）
+        :param replicas: 每个节点的虚拟节点数，越大分布越均匀
+        """
+        self.replicas = replicas
+        self._keys = []
+        self._nodes = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        for index in range(self.replicas):
+            key = _hash(f"{node}#{index}")
+            bisect.insort(self._keys, key)
+            self._nodes[key] = node
+
+    def remove(self, node):
+        for index in range(self.replicas):
+            key = _hash(f"{node}#{index}")
+            self._keys.remove(key)
+            del self._nodes[key]
+
+    def get(self, key):
+        if not self._keys:
+            raise LookupError("哈希环为空")
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._nodes[self._keys[index]]
+
+    @property
+    def nodes(self):
+        return set(self._nodes.values())
+
+
+# 工作进程回传指标增量的间隔（秒）
+METRICS_FLUSH_INTERVAL = 1.0
+
+
+class _LogSink:
+    """QueueHandler 的队列：把工作进程的日志记录经结果队列交给协调进程写入"""
+
+    def __init__(self, worker_id, result_queue):
+        self.worker_id = worker_id
+        self.result_queue = result_queue
+
+    def put_nowait(self, record):
+        self.result_queue.put({"type": "log", "worker": self.worker_id, "record": record})
+
+
+# 工作进程的日志器：记录经结果队列回传，由协调进程的日志器统一过滤与写入
+def _worker_logger(worker_id, result_queue, level):
+    logger = logging.getLogger(f"xmut.pool.worker{worker_id}")
+    logger.handlers.clear()
+    logger.addHandler(logging.handlers.QueueHandler(_LogSink(worker_id, result_queue)))
+    logger.propagate = False
+    logger.setLevel(level)
+    return logger
+
+
+# 工作进程入口：对分到的考生运行 查询 → 模式判断 → 推送，结果、指标增量与日志记录经队列回传
+def _worker_main(worker_id, config, entries, command_queue, result_queue, max_concurrency, shares=1,
+                 log_level=None):
+    """
+    :param shares: 工作进程总数，全局限速在各进程间平分
+    :param log_level: 协调进程日志器的级别，为空时不记录日志
+    """
+    # 停止由协调进程统一下发，Ctrl+C 不直接打断工作进程
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # fork 启动时继承了协调进程已有的计数，先清零，之后只回传本进程的增量
+    REGISTRY.drain()
+
+    last_sent = {}  # 考生号 -> 上次回传的响应指纹，内容不变时不重复回传
+
+    def on_result(candidate, response_json):
+        digest = fingerprint(response_json)
+        if last_sent.get(candidate.ksh) == digest and not candidate.done:
+            return
+        last_sent[candidate.ksh] = digest
+        result_queue.put({
+            "type": "result",
+            "worker": worker_id,
+            "ksh": candidate.ksh,
+            "query_count": candidate.query_count,
+            "response": response_json,
+            "last_response": candidate.last_response_dict(),
+            "done": candidate.done
+        })
+
+    dispatcher = NotificationDispatcher().start()
+    coalescer = NotificationCoalescer.from_config(config, dispatcher)
+    if coalescer is not None:
+        coalescer.start()
+    engine = QueryEngine(
+        load_candidates(config, dispatcher=dispatcher, coalescer=coalescer, entries=entries),
+        interval=config['interval'],
+        transport=create_transport(config, pool_size=max_concurrency),
+        max_concurrency=max_concurrency,
+        limiter=TokenBucket.from_config(config, shares),
+        dispatcher=dispatcher,
+        coalescer=coalescer,
+        breaker=CircuitBreaker.from_config(config),
+        on_result=on_result,
+        persistent=True,
+        logger=_worker_logger(worker_id, result_queue, log_level) if log_level is not None else None
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: engine.stop())
+    stopped = threading.Event()
+
+    def send_metrics():
+        deltas = REGISTRY.drain()
+        if deltas:
+            result_queue.put({"type": "metrics", "worker": worker_id, "metrics": deltas})
+
+    # 指标线程：定期回传指标增量，协调进程的 /metrics 与汇总行为全部进程之和
+    def flush_metrics():
+        while not stopped.wait(METRICS_FLUSH_INTERVAL):
+            send_metrics()
+
+    # 命令线程：接收协调进程追加的考生或停止指令
+    def read_commands():
+        while True:
+            command = command_queue.get()
+            if command["type"] == "stop":
+                engine.stop()
+                return
+            if command["type"] == "add":
+                added = load_candidates(config, dispatcher=dispatcher, coalescer=coalescer, entries=command["entries"])
+                for candidate in added:
+                    engine.add_candidate(candidate)
+
+    threading.Thread(target=read_commands, name="pool-commands", daemon=True).start()
+    threading.Thread(target=flush_metrics, name="pool-metrics", daemon=True).start()
+    try:
+        asyncio.run(engine.run())
+    finally:
+        engine.close()
+        close_clients()
+        stopped.set()
+        send_metrics()
+        result_queue.put({"type": "exit", "worker": worker_id})
+
+
+class WorkerPool:
+    """多进程分片查询：按一致性哈希把考生分给各工作进程，进程退出时重新分配其考生"""
+
+    def __init__(self, config, workers=None, max_concurrency=50, state_path="state.json", logger=None):
+        """
+        :param config: 配置（candidates 为考生列表）
+        :param workers: 工作进程数，默认 CPU 核数
+        :param max_concurrency: 每个工作进程同时在途的最大请求数
+        """
+        self.config = config
+        self.workers = workers or multiprocessing.cpu_count()
+        self.max_concurrency = max_concurrency
+        self.logger = logger
+        self.state = StateStore(state_path)
+        self.history = HistoryStore.from_config(config)
+        self.ring = HashRing(range(self.workers))
+        self.result_queue = multiprocessing.Queue()
+        self.processes = {}
+        self.command_queues = {}
+        self.assignments = {}  # 工作进程编号 -> {考生号: 考生配置}
+        self.done = set()
+        self._stop_event = threading.Event()
+
+        # 考生配置带上已保存的上次结果，迁移时一并带走
+        self.entries = {}
+        for entry in config.get('candidates') or []:
+            entry = dict(entry)
+            entry['last_response'] = self.state.get(entry['ksh'], entry.get('last_response'))
+            self.entries[entry['ksh']] = entry
+
+    def _log(self, message):
+        print(message)
+        if self.logger:
+            self.logger.info(message)
+
+    def _spawn(self, worker_id, entries):
+        command_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=_worker_main,
+            args=(worker_id, self.config, entries, command_queue, self.result_queue, self.max_concurrency,
+                  len(self.assignments), self.logger.getEffectiveLevel() if self.logger else None),
+            name=f"query-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self.processes[worker_id] = process
+        self.command_queues[worker_id] = command_queue
+
+    def start(self):
+        for worker_id in range(self.workers):
+            self.assignments[worker_id] = {}
+        for ksh, entry in self.entries.items():
+            self.assignments[self.ring.get(ksh)][ksh] = entry
+        # 没有分到考生的进程不启动，并从哈希环移除，迁移时也不会分到它
+        for worker_id in [worker_id for worker_id, shard in self.assignments.items() if not shard]:
+            del self.assignments[worker_id]
+            self.ring.remove(worker_id)
+        for worker_id, shard in self.assignments.items():
+            self._spawn(worker_id, list(shard.values()))
+        self._log(f"已启动{len(self.processes)}个工作进程，共{len(self.entries)}名考生")
+
+    def _handle_message(self, message):
+        """处理工作进程回传的消息：查询结果、指标增量或日志记录"""
+        if message["type"] == "result":
+            self._handle_result(message)
+        elif message["type"] == "metrics":
+            REGISTRY.merge(message["metrics"])
+        elif message["type"] == "log" and self.logger:
+            self.logger.handle(message["record"])
+
+    def _handle_result(self, message):
+        ksh = message["ksh"]
+        if ksh not in self.entries:
+            return
+        self.entries[ksh]['last_response'] = message["last_response"]
+        self.state.set(ksh, message["last_response"])
+        if self.history is not None:
+            self.history.record(ksh, message["response"], message["query_count"])
+        if message["done"]:
+            self.done.add(ksh)
+
+    def _reassign(self, dead_worker):
+        """工作进程意外退出：从哈希环移除，并把其未完成的考生迁移到其余进程"""
+        self.ring.remove(dead_worker)
+        shard = self.assignments.pop(dead_worker, {})
+        self.processes.pop(dead_worker, None)
+        self.command_queues.pop(dead_worker, None)
+        if not self.ring.nodes:
+            self._log("所有工作进程均已退出")
+            self._stop_event.set()
+            return
+        moved = {}
+        for ksh, entry in shard.items():
+            if ksh in self.done:
+                continue
+            target = self.ring.get(ksh)
+            self.assignments[target][ksh] = entry
+            moved.setdefault(target, []).append(entry)
+        for target, entries in moved.items():
+            self.command_queues[target].put({"type": "add", "entries": entries})
+        self._log(f"工作进程{dead_worker}已退出，{sum(len(e) for e in moved.values())}名考生已重新分配")
+
+    def run(self):
+        """协调循环：汇总结果、检测进程存活，直到全部考生完成或 stop()"""
+        self.start()
+        try:
+            if not self.processes:
+                self._log("没有需要查询的考生")
+                return
+            while not self._stop_event.is_set():
+                try:
+                    message = self.result_queue.get(timeout=0.5)
+                except queue.Empty:
+                    message = None
+                if message is not None:
+                    self._handle_message(message)
+                for worker_id, process in list(self.processes.items()):
+                    if not process.is_alive():
+                        self._reassign(worker_id)
+                if self.entries and len(self.done) == len(self.entries):
+                    self._log("全部考生均已检测到目标结果")
+                    break
+        finally:
+            self.close()
+
+    def stop(self):
+        """请求停止（可在信号处理函数中调用）"""
+        self._stop_event.set()
+
+    def close(self, timeout=10.0):
+        for command_queue in self.command_queues.values():
+            command_queue.put({"type": "stop"})
+        # 等待退出期间持续取走回传的消息：队列积压时工作进程写不完，无法退出
+        deadline = time.monotonic() + timeout
+        while any(process.is_alive() for process in self.processes.values()) and time.monotonic() < deadline:
+            try:
+                self._handle_message(self.result_queue.get(timeout=0.1))
+            except queue.Empty:
+                pass
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        # 取走退出前仍在队列中的结果、指标与日志
+        while True:
+            try:
+                message = self.result_queue.get_nowait()
+            except queue.Empty:
+                break
+            self._handle_message(message)
+        self.state.close()
+        if self.history is not None:
+            self.history.close()
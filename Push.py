@@ -1,27 +1,78 @@
-import requests
 import json
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
 from Notifier import NotifierBase
 
+# 推送请求超时：(连接, 读取)，避免推送接口无响应时长时间阻塞
+PUSH_TIMEOUT = (3.05, 10.0)
+
+
+class PushClient:
+    """推送接口客户端：每个推送服务一个长连接会话，重复推送复用已建立的连接"""
+
+    def __init__(self, timeout=PUSH_TIMEOUT, pool_size=4):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Content-Type": "application/json; charset=utf-8",
+            "Connection": "keep-alive"
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def post_json(self, url, data, headers=None):
+        """以 UTF-8 编码发送 JSON 请求体，返回响应"""
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return self.session.post(url, data=body, headers=headers, timeout=self.timeout)
+
+    def close(self):
+        self.session.close()
+
+
+_clients = {}  # (协议, 主机) -> PushClient
+_clients_lock = threading.Lock()
+
+
+# 按推送服务（协议+主机）取得共享的客户端，首次使用时创建
+def get_client(url):
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = PushClient()
+        return client
+
+
+# 关闭全部推送客户端（程序退出时调用）
+def close_clients():
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
 def _send_post_request(url, headers, data, success_code):
-    """通用POST请求发送函数，提取重复逻辑"""
-    try:
-        response = requests.post(
-            url=url,
-            headers=headers,
-            data=json.dumps(data, ensure_ascii=False)
-        )
-        if response.status_code != 200:
-            raise Exception(f"状态码：{response.status_code}")
-        result = response.json()
-        if result.get("code") != success_code:
-            error_msg = result.get("msg") or result.get("message") or "未知错误"
-            raise Exception(error_msg)
-    except Exception as e:
-        raise e  # 让调用方处理具体错误信息
+    """通用POST请求发送函数，提取重复逻辑；经推送服务的长连接会话发送"""
+    response = get_client(url).post_json(url, data, headers)
+    if response.status_code != 200:
+        raise Exception(f"状态码：{response.status_code}")
+    result = response.json()
+    if result.get("code") != success_code:
+        error_msg = result.get("msg") or result.get("message") or "未知错误"
+        raise Exception(error_msg)
 
 
 class PushPlusNotifier(NotifierBase):
     """PushPlus 推送实现"""
+    name = "PushPlus"
+    url = "http://www.pushplus.plus/send"
+
     def __init__(self, token, title, content, interval_seconds=10, duration_minutes=10):
         super().__init__(title, content, interval_seconds, duration_minutes)
         self.token = token
@@ -29,8 +80,8 @@ class PushPlusNotifier(NotifierBase):
     def send_message(self, title, message):
         try:
             _send_post_request(
-                url="http://www.pushplus.plus/send",
-                headers={"Content-Type": "application/json; charset=utf-8"},
+                url=self.url,
+                headers=None,
                 data={"token": self.token, "title": title, "content": message},
                 success_code=200
             )
@@ -40,6 +91,9 @@ class PushPlusNotifier(NotifierBase):
 
 class ServerChanTurboNotifier(NotifierBase):
     """ServerChan Turbo 推送实现"""
+    name = "ServerChan Turbo"
+    url_template = "https://sctapi.ftqq.com/{token}.send"
+
     def __init__(self, token, title, content, interval_seconds=10, duration_minutes=10):
         super().__init__(title, content, interval_seconds, duration_minutes)
         self.token = token
@@ -47,8 +101,8 @@ class ServerChanTurboNotifier(NotifierBase):
     def send_message(self, title, message):
         try:
             _send_post_request(
-                url=f"https://sctapi.ftqq.com/{self.token}.send",
-                headers={"Content-Type": "application/json; charset=utf-8"},
+                url=self.url_template.format(token=self.token),
+                headers=None,
                 data={"title": title, "desp": message},
                 success_code=0
             )
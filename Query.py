@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import requests
+
+from Breaker import CircuitBreaker
+from Diff import ResponseDiffer, tracked_fields
+from Errors import (CircuitOpenError, QueryConnectionError, QueryDecodeError, QueryError, QueryHTTPError,
+                    QueryServerError, QueryTimeoutError)
+from Metrics import DECODE_SECONDS, FETCH_SECONDS, HANDLE_SECONDS, REQUEST_ERRORS, REQUESTS, timed
+from Rules import RuleSet, rules_for
+from Transport import QueryTransport
+
+# 仅用于类型标注；推送模块在 init_notifier 中按需导入，单次检查等不推送的路径无需加载
+if TYPE_CHECKING:
+    from Notifier import NotifierBase
+    from RateLimiter import TokenBucket
+
+# 未显式传入传输层时共用的默认实例
+_default_transport = None
+
+# 推送内容中展示的字段（键名, 显示名, 默认值）
+NOTIFY_FIELDS = [
+    ("xm", "姓名", "未知姓名"),
+    ("xy", "录取学院", "未知学院"),
+    ("result", "录取专业", "未知专业"),
+    ("tzsbh", "通知书编号", "未知编号"),
+    ("dh", "EMS单号", "未知单号"),
+    ("txdz", "通讯地址", "未知地址"),
+]
+FIELD_LABELS = {key: label for key, label, _ in NOTIFY_FIELDS}
+FIELD_LABELS["ok"] = "录取状态"
+
+
+# 格式化部分隐藏显示
+def format_partial_hide(value):
+    if not value or len(value) <= 7:
+        return value
+    return f"{value[:3]}{'*' * (len(value) - 7)}{value[-4:]}"
+
+
+# 初始化推送器（method 可用逗号连接多个渠道，如 "pushplus,serverchan_turbo"，此时并行推送）
+def init_notifier(push_method, pushplus_token, serverchan_token) -> None | NotifierBase:
+    from Notifier import CompositeNotifier
+    from Push import PushPlusNotifier, ServerChanTurboNotifier
+
+    title = "录取通知"
+    content = "恭喜！您已成功录取，请及时查看详情。"
+    notifiers = []
+    for method in str(push_method).split(","):
+        method = method.strip()
+        if method == "pushplus" and pushplus_token:
+            notifiers.append(PushPlusNotifier(
+                token=pushplus_token,
+                title=title,
+                content=content,
+                interval_seconds=10,
+                duration_minutes=10
+            ))
+        elif method == "serverchan_turbo" and serverchan_token:
+            notifiers.append(ServerChanTurboNotifier(
+                token=serverchan_token,
+                title=title,
+                content=content,
+                interval_seconds=10,
+                duration_minutes=10
+            ))
+    if not notifiers:
+        return None
+    if len(notifiers) == 1:
+        return notifiers[0]
+    return CompositeNotifier(notifiers, title, content)
+
+
+# 格式化字段级变更：显示名：旧值 → 新值
+def format_changes(changes):
+    return "\n".join(
+        f"{FIELD_LABELS.get(key, key)}：{'无' if old is None else old} → {'无' if new is None else new}"
+        for key, old, new in changes
+    )
+
+
+# 发送通知（用字段列表简化内容生成）
+def send_notification(notifier: None | NotifierBase, response_json, current_time, changes=None):
+    if not notifier:
+        return False
+
+    tdd_data = response_json.get("tdd", {})
+    info_lines = [f"{label}：{tdd_data.get(key, default)}" for key, label, default in NOTIFY_FIELDS]
+    change_section = f"🔄 变更内容\n{format_changes(changes)}\n\n" if changes else ""
+
+    push_content = (
+        f"🎉 厦门理工学院录取信息更新 🎉\n\n"
+        f"{change_section}"
+        f"📌 基本信息\n"
+        f"{info_lines[0]}\n\n"  # 姓名
+        f"🎓 录取详情\n"
+        f"{info_lines[1]}\n"    # 学院
+        f"{info_lines[2]}\n\n"  # 专业
+        f"📜 通知书信息\n"
+        f"{info_lines[3]}\n"    # 通知书编号
+        f"{info_lines[4]}\n"    # EMS单号
+        f"{info_lines[5]}\n\n"  # 地址
+        f"⏰ 查询时间：{current_time}"
+    )
+
+    # 每条推送事件都可能开始新一轮推送有效时长（长时间运行时启动时间早已超出有效时长）
+    start_episode = getattr(notifier, "start_episode", None)
+    if start_episode is not None:
+        start_episode()
+    try:
+        sent = notifier.send(title="厦门理工学院录取信息更新", message=push_content)
+        if getattr(notifier, 'queued', False):
+            print("推送已加入后台队列\n" if sent else "推送队列已满，本次推送未发送\n")
+        else:
+            print("推送成功\n")
+        return sent
+    except Exception as e:
+        print(f"推送失败: {str(e)}\n")
+        return False
+
+
+# 将 requests 异常归类为具体的查询错误类型
+def classify_error(error):
+    if isinstance(error, requests.exceptions.Timeout):
+        return QueryTimeoutError(f"请求超时: {error}")
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return QueryConnectionError(f"连接失败: {error}")
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        status_code = error.response.status_code
+        error_class = QueryServerError if status_code >= 500 else QueryHTTPError
+        return error_class(f"HTTP {status_code}", status_code)
+    return QueryError(f"请求异常: {error}")
+
+
+# 拆分：发送查询请求
+def fetch_data(ksh, sfzh, transport: None | QueryTransport = None, limiter: None | TokenBucket = None,
+               breaker: None | CircuitBreaker = None):
+    global _default_transport
+    if transport is None:
+        if _default_transport is None:
+            _default_transport = QueryTransport()
+        transport = _default_transport
+    if breaker is not None:
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            REQUEST_ERRORS.inc(type="CircuitOpenError")
+            raise
+    if limiter is not None:
+        limiter.acquire()
+    REQUESTS.inc()
+    try:
+        with FETCH_SECONDS.time():
+            response = transport.post({"ksh": ksh, "sfzh": sfzh})
+            response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        error = classify_error(e)
+        REQUEST_ERRORS.inc(type=type(error).__name__)
+        if breaker is not None:
+            breaker.record_failure(error)
+        raise error from e
+    if breaker is not None:
+        breaker.record_success()
+    return response
+
+
+# 解析响应 JSON，失败时抛出 QueryDecodeError
+def decode_response(response):
+    try:
+        with DECODE_SECONDS.time():
+            return response.json()
+    except ValueError as e:
+        REQUEST_ERRORS.inc(type="QueryDecodeError")
+        raise QueryDecodeError("响应解析错误，不是有效的JSON格式") from e
+
+
+# 拆分：处理查询模式逻辑（推送与停止条件由规则集判断，query_mode 对应内置规则）
+@timed(HANDLE_SECONDS)
+def handle_query_mode(response_json, config, last_response, notifier, current_time,
+                      differ: None | ResponseDiffer = None, rules: None | RuleSet = None):
+    if rules is None:
+        rules = rules_for(config)
+    tdd_data = response_json.get("tdd", {})
+
+    changes = []
+    if rules.watches_changes:
+        # 规则含 changed 条件时计算字段级差异（指纹相同则直接跳过逐字段比较）
+        if differ is None:
+            differ = ResponseDiffer(config.get('ignore_fields'))
+        changes = differ.compare(last_response, response_json)
+    old_fields = tracked_fields(last_response) if last_response is not None else None
+    should_notify, should_stop = rules.evaluate(
+        old_fields, tracked_fields(response_json), {key for key, _, _ in changes}
+    )
+
+    if changes:
+        print(f"检测到数据变更！\n{format_changes(changes)}")
+    elif not rules.watches_changes and "ok" in response_json and response_json["ok"] is True:
+        # 打印录取信息
+        print(f"查询结果：已录取 - {tdd_data.get('xm', '未知姓名')}（{tdd_data.get('ksh', '未知考生号')}）")
+        print(f"学院：{tdd_data.get('xy', '未知学院')}，专业：{tdd_data.get('result', '未知专业')}")
+        print(f"通知书编号：{tdd_data.get('tzsbh', '未知编号')}，EMS单号：{tdd_data.get('dh', '未知单号')}")
+        print(f"通讯地址：{tdd_data.get('txdz', '未知地址')}\n")
+
+    if should_notify:
+        send_notification(notifier, response_json, current_time, changes or None)
+
+    # 监测变更时只在内容变化（或首次查询）时更新上次结果
+    if rules.watches_changes and not changes and last_response is not None:
+        return last_response, should_stop
+    return response_json, should_stop
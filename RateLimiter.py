@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """令牌桶限速器：控制全局每秒请求数，允许有限突发
+
+    令牌不足时按到达顺序预支（余额可为负），等待时间依次递增，
+    因此多个考生共享同一个桶时请求会被均匀摊开，不会有人一直抢不到。
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        :param rate: 每秒补充的令牌数（即全局请求速率上限）
+        :param burst: 桶容量（允许的最大突发请求数）
+        """
+        if rate <= 0:
+            raise ValueError("rate 必须大于0")
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, shares=1):
+        """按配置创建限速器，rate 不大于0时表示不限速，返回 None
+
+        :param shares: 共同分摊全局速率的进程数，每个进程的速率与突发数为配置值的 1/shares
+        """
+        rate_limit = config.get('rate_limit') or {}
+        rate = rate_limit.get('rate', 0)
+        if not rate or rate <= 0:
+            return None
+        return cls(rate / shares, rate_limit.get('burst', 1) / shares)
+
+    def reserve(self, tokens=1):
+        """预留令牌，返回需要等待的秒数（0 表示可立即发送）"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens=1):
+        """阻塞等待直到获得令牌"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens=1):
+        """协程版本：等待期间不阻塞事件循环"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
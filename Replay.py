@@ -0,0 +1,206 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+from Diff import ResponseDiffer
+from History import HistoryStore
+from Notifier import NotifierBase
+from Query import handle_query_mode
+from Rules import rules_for, validate_rules
+
+
+class VirtualClock:
+    """虚拟时钟：回放时按记录时间或固定间隔推进，不真实等待"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance_to(self, ts):
+        self.now = max(self.now, ts)
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class RecordingNotifier(NotifierBase):
+    """模拟推送器：不发送请求，只记录推送内容；频率与有效时长限制按虚拟时钟判断"""
+
+    name = "回放"
+
+    def __init__(self, clock, interval_seconds=10, duration_minutes=10):
+        super().__init__("录取通知", "回放", interval_seconds, duration_minutes, clock=clock)
+        self.sent = []  # [(虚拟时间, 标题, 内容)]
+
+    def send_message(self, title, message):
+        self.sent.append((self.clock(), title, message))
+
+
+class ReplayEvent:
+    """一次回放查询中发生的推送或停止"""
+
+    def __init__(self, index, ts, pushed, stopped):
+        self.index = index
+        self.ts = ts
+        self.pushed = pushed
+        self.stopped = stopped
+
+    def __repr__(self):
+        actions = "、".join(action for action, flag in (("推送", self.pushed), ("停止", self.stopped)) if flag)
+        return f"第{self.index}次查询 [{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.ts))}] {actions}"
+
+
+class ReplayResult:
+    """回放汇总：查询次数、推送/停止事件与处理速度"""
+
+    def __init__(self):
+        self.polls = 0
+        self.events = []
+        self.elapsed = 0.0
+
+    @property
+    def pushes(self):
+        return sum(1 for event in self.events if event.pushed)
+
+    @property
+    def stops(self):
+        return [event for event in self.events if event.stopped]
+
+    def report(self, limit=20):
+        rate = self.polls / self.elapsed if self.elapsed else 0.0
+        lines = [f"回放查询：{self.polls}次，推送：{self.pushes}次，停止：{len(self.stops)}次",
+                 f"耗时：{self.elapsed:.2f}s（{rate:,.0f} 次/秒）"]
+        lines.extend(repr(event) for event in self.events[:limit])
+        if len(self.events) > limit:
+            lines.append(f"……其余{len(self.events) - limit}条事件未显示")
+        return "\n".join(lines)
+
+
+# 逐行读取录制的响应：每行为响应 JSON，或 {"ts": 时间戳, "response": 响应 JSON}
+def read_recording(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict) and "response" in record:
+                yield record.get("ts"), record["response"]
+            else:
+                yield None, record
+
+
+# 从响应历史库读取某考生的变化记录
+def read_history(path, ksh, start=None, end=None):
+    history = HistoryStore(path)
+    try:
+        for row in history.scan(ksh, start, end):
+            yield row["ts"], row["response"]
+    finally:
+        history.close()
+
+
+# 把录制的响应依次送入模式判断与推送逻辑（虚拟时钟、模拟推送器），返回回放结果
+def replay(records, query_mode=1, interval=5.0, ignore_fields=(), push_interval=10, push_minutes=10,
+           keep_going=False, start=None, rules=None):
+    """
+    :param records: 可迭代的 (时间戳或 None, 响应 JSON)；时间戳为空时按 interval 推进虚拟时钟
+    :param rules: 自定义推送/停止规则（为空时使用 query_mode 的内置规则）
+    :param keep_going: 检测到停止条件后继续回放（报告全部会停止的查询），默认与实际查询一样结束
+    """
+    clock = VirtualClock(time.time() if start is None else start)
+    notifier = RecordingNotifier(clock, push_interval, push_minutes)
+    config = {"query_mode": query_mode, "ignore_fields": list(ignore_fields), "rules": rules}
+    ruleset = rules_for(config)
+    differ = ResponseDiffer(ignore_fields)
+    last_response = None
+    result = ReplayResult()
+
+    started = time.perf_counter()
+    for ts, response_json in records:
+        if ts is None:
+            if result.polls:
+                clock.advance(interval)
+        else:
+            clock.advance_to(ts)
+        result.polls += 1
+        pushed_before = len(notifier.sent)
+        last_response, should_stop = handle_query_mode(
+            response_json, config, last_response, notifier, time.strftime("%H:%M:%S", time.localtime(clock.now)),
+            differ, ruleset
+        )
+        pushed = len(notifier.sent) > pushed_before
+        if pushed or should_stop:
+            result.events.append(ReplayEvent(result.polls, clock.now, pushed, should_stop))
+            if should_stop and not keep_going:
+                break
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="离线回放录制的查询响应，检验查询模式的停止与推送判断")
+    parser.add_argument("source", help="录制文件（每行一个响应 JSON）或响应历史库 history.db")
+    parser.add_argument("--ksh", help="从历史库回放时的考生号")
+    parser.add_argument("--mode", type=int, default=1, choices=[1, 2, 3], help="查询模式")
+    parser.add_argument("--interval", type=float, default=5.0, help="记录无时间戳时的虚拟查询间隔（秒）")
+    parser.add_argument("--rules", help="自定义规则文件（JSON 规则列表），覆盖 --mode 的内置规则")
+    parser.add_argument("--ignore-field", action="append", default=[], help="模式3中不参与比较的字段（可重复）")
+    parser.add_argument("--push-interval", type=float, default=10, help="模拟推送器的最短推送间隔（秒）")
+    parser.add_argument("--push-minutes", type=float, default=10, help="模拟推送器的有效时长（分钟）")
+    parser.add_argument("--repeat", type=int, default=1, help="重复回放录制内容的次数（用于压测）")
+    parser.add_argument("--keep-going", action="store_true", help="检测到停止条件后继续回放")
+    parser.add_argument("--verbose", action="store_true", help="显示模式判断的控制台输出")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.source.endswith(".db"):
+        if not args.ksh:
+            print("从历史库回放时需要指定 --ksh")
+            return 2
+        records = read_history(args.source, args.ksh)
+    else:
+        records = read_recording(args.source)
+
+    rules = None
+    if args.rules:
+        with open(args.rules, encoding='utf-8') as f:
+            rules = json.load(f)
+        errors = validate_rules(rules)
+        if errors:
+            print("\n".join(errors))
+            return 2
+
+    # 重复回放时先读入内存并去掉时间戳，由虚拟时钟按间隔推进；否则逐行流式读取
+    if args.repeat > 1:
+        responses = [response for _, response in records]
+        records = ((None, response) for _ in range(args.repeat) for response in responses)
+
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, \
+            contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull):
+        result = replay(
+            records,
+            query_mode=args.mode,
+            interval=args.interval,
+            ignore_fields=args.ignore_field,
+            push_interval=args.push_interval,
+            push_minutes=args.push_minutes,
+            keep_going=args.keep_going,
+            rules=rules
+        )
+    if not result.polls:
+        print("没有可回放的记录")
+        return 2
+    print(result.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import argparse
+import csv
+import itertools
+import json
+import sys
+import time
+
+from Config import read_config, save_config
+from History import HistoryStore
+
+# 身份证号（GB 11643）前17位的加权系数与校验码
+ID_WEIGHTS = (7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2)
+ID_CHECK_CODES = "10X98765432"
+
+# 导出字段：(列名, 取值函数)
+EXPORT_FIELDS = (
+    ("ksh", lambda record: record["ksh"]),
+    ("time", lambda record: time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record["ts"]))),
+    ("ok", lambda record: record["response"].get("ok")),
+    ("xm", lambda record: (record["response"].get("tdd") or {}).get("xm")),
+    ("xy", lambda record: (record["response"].get("tdd") or {}).get("xy")),
+    ("result", lambda record: (record["response"].get("tdd") or {}).get("result")),
+    ("tzsbh", lambda record: (record["response"].get("tdd") or {}).get("tzsbh")),
+    ("dh", lambda record: (record["response"].get("tdd") or {}).get("dh")),
+)
+
+
+# 考生号验证器
+def validate_ksh(value):
+    if len(value) == 14 and value.isdigit():
+        return True, ""
+    return False, "考生号格式不正确，应为14位数字！"
+
+
+# 身份证号验证器（格式 + 校验码）
+def validate_sfzh(value):
+    upper_val = value.upper()
+    if not (len(upper_val) == 18 and upper_val[:-1].isdigit() and (upper_val[-1].isdigit() or upper_val[-1] == 'X')):
+        return False, "身份证号格式不正确，应为18位数字（最后一位可为X）！"
+    checksum = sum(int(digit) * weight for digit, weight in zip(upper_val, ID_WEIGHTS))
+    if ID_CHECK_CODES[checksum % 11] != upper_val[-1]:
+        return False, "身份证号校验码不正确，请检查是否输错！"
+    return True, ""
+
+
+class ImportReport:
+    """批量导入结果：新增数、重复数与错误行（行号, 原因）"""
+
+    def __init__(self):
+        self.added = 0
+        self.duplicates = 0
+        self.errors = []
+
+    def report(self, limit=20):
+        lines = [f"导入完成：新增{self.added}名考生，重复{self.duplicates}条，错误{len(self.errors)}行"]
+        lines.extend(f"第{line}行：{message}" for line, message in self.errors[:limit])
+        if len(self.errors) > limit:
+            lines.append(f"……其余{len(self.errors) - limit}行错误未显示")
+        return "\n".join(lines)
+
+
+# 流式读取 CSV：逐块返回 [(行号, {"ksh": ..., "sfzh": ..., ...}), ...]
+def read_csv_chunks(path, chunk_size=1000):
+    """首行含 ksh 列名时按列名读取（可带 query_mode 列），否则按 考生号,身份证号 的顺序读取"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        first = next(reader, None)
+        if first is None:
+            return
+        header = [name.strip().lower() for name in first]
+        if "ksh" in header:
+            columns, rows = header, reader
+        else:
+            columns, rows = ["ksh", "sfzh", "query_mode"], itertools.chain([first], reader)
+        # 先跳过空行再分块，连续的空行不会产生空块而提前结束
+        numbered = ((reader.line_num, row) for row in rows if any(value.strip() for value in row))
+        while True:
+            chunk = [
+                (line, {key: value.strip() for key, value in zip(columns, row)})
+                for line, row in itertools.islice(numbered, chunk_size)
+            ]
+            if not chunk:
+                break
+            yield chunk
+
+
+# 批量校验一块数据，返回 (有效的考生配置列表, [(行号, 原因), ...])
+def validate_rows(chunk, seen):
+    """
+    :param seen: 已存在（或本次已导入）的考生号集合，重复的考生号记为 None 并跳过
+    """
+    entries, errors = [], []
+    for line, row in chunk:
+        ksh, sfzh = row.get("ksh", ""), row.get("sfzh", "").upper()
+        problems = [message for valid, message in (validate_ksh(ksh), validate_sfzh(sfzh)) if not valid]
+        query_mode = row.get("query_mode") or None
+        if query_mode is not None and query_mode not in ("1", "2", "3"):
+            problems.append(f"查询模式 {query_mode} 无效，应为1、2或3")
+        if problems:
+            errors.append((line, "；".join(problems)))
+            continue
+        if ksh in seen:
+            entries.append(None)
+            continue
+        seen.add(ksh)
+        entry = {"ksh": ksh, "sfzh": sfzh}
+        if query_mode is not None:
+            entry["query_mode"] = int(query_mode)
+        entries.append(entry)
+    return entries, errors
+
+
+# 从 CSV 批量导入考生到配置的 candidates（跳过已存在的考生号）
+def import_candidates(config, path, chunk_size=1000):
+    candidates = config.setdefault('candidates', [])
+    seen = {entry['ksh'] for entry in candidates}
+    report = ImportReport()
+    for chunk in read_csv_chunks(path, chunk_size):
+        entries, errors = validate_rows(chunk, seen)
+        report.errors.extend(errors)
+        for entry in entries:
+            if entry is None:
+                report.duplicates += 1
+            else:
+                candidates.append(entry)
+                report.added += 1
+    return report
+
+
+# 流式导出各考生的最新查询结果（CSV 或 JSON Lines），返回导出条数
+def export_results(history, output, fmt="csv", batch_size=500):
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(output)
+        writer.writerow([name for name, _ in EXPORT_FIELDS])
+    for record in history.iter_latest(batch_size):
+        values = [getter(record) for _, getter in EXPORT_FIELDS]
+        if fmt == "csv":
+            writer.writerow(["" if value is None else value for value in values])
+        else:
+            output.write(json.dumps(dict(zip((name for name, _ in EXPORT_FIELDS), values)), ensure_ascii=False))
+            output.write("\n")
+        count += 1
+        if count % batch_size == 0:
+            output.flush()
+    output.flush()
+    return count
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="批量导入考生（CSV）/ 导出查询结果（CSV 或 JSON Lines）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    importer = subparsers.add_parser("import", help="从 CSV 导入考生（列：ksh,sfzh[,query_mode]，首行可为列名）")
+    importer.add_argument("csv", help="考生名单 CSV 文件")
+    importer.add_argument("--config", default="config.json", help="配置文件路径（默认 config.json）")
+    importer.add_argument("--chunk-size", type=int, default=1000, help="每批读取与校验的行数")
+    importer.add_argument("--dry-run", action="store_true", help="只校验，不写入配置")
+
+    exporter = subparsers.add_parser("export", help="导出各考生的最新查询结果")
+    exporter.add_argument("output", help="输出文件，- 表示标准输出")
+    exporter.add_argument("--format", choices=["csv", "jsonl"], help="输出格式（默认按扩展名判断）")
+    exporter.add_argument("--history", default="history.db", help="响应历史库路径（默认 history.db）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "import":
+        config = read_config(args.config)
+        report = import_candidates(config, args.csv, args.chunk_size)
+        print(report.report())
+        if report.added and not args.dry_run:
+            save_config(config, args.config)
+        return 1 if report.errors else 0
+
+    fmt = args.format or ("jsonl" if args.output.endswith((".jsonl", ".json")) else "csv")
+    history = HistoryStore(args.history)
+    try:
+        if args.output == "-":
+            count = export_results(history, sys.stdout, fmt)
+        else:
+            with open(args.output, "w", newline='' if fmt == "csv" else None, encoding='utf-8') as output:
+                count = export_results(history, output, fmt)
+    finally:
+        history.close()
+    print(f"已导出{count}名考生的查询结果", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
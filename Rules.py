@@ -0,0 +1,134 @@
+import json
+
+# 查询模式对应的内置规则
+PRESETS = {
+    # 模式1：查到录取即推送并停止
+    1: [{"name": "已录取", "when": [{"field": "ok", "op": "equals", "value": True}], "notify": True, "stop": True}],
+    # 模式2：EMS单号不再是"暂未发出"时推送并停止
+    2: [{"name": "EMS已发出", "when": [
+        {"field": "ok", "op": "equals", "value": True},
+        {"field": "dh", "op": "not_equals", "value": "暂未发出", "default": "暂未发出"}
+    ], "notify": True, "stop": True}],
+    # 模式3：任一字段变化时推送，不停止
+    3: [{"name": "数据变更", "when": [{"field": "*", "op": "changed"}], "notify": True, "stop": False}]
+}
+
+OPERATORS = ("changed", "equals", "not_equals", "became", "no_longer_equals")
+# 需要上次字段值才能判断的运算
+HISTORY_OPERATORS = ("became", "no_longer_equals")
+
+
+# 把单个条件编译为谓词 predicate(old_fields, new_fields, changed_keys)
+def compile_condition(spec):
+    field = spec.get("field", "*")
+    op = spec.get("op")
+    value = spec.get("value")
+    default = spec.get("default")
+
+    if op not in OPERATORS:
+        raise ValueError(f"未知的规则条件：{op}（可用：{'、'.join(OPERATORS)}）")
+    if op == "changed":
+        if field == "*":
+            return lambda old, new, changed: bool(changed)
+        return lambda old, new, changed: field in changed
+    if field == "*":
+        raise ValueError(f"条件 {op} 需要指定具体字段")
+
+    if op == "equals":
+        return lambda old, new, changed: new.get(field, default) == value
+    if op == "not_equals":
+        return lambda old, new, changed: new.get(field, default) != value
+    if op == "became":
+        # 上次不等于（或没有上次结果）、本次等于
+        return lambda old, new, changed: (new.get(field, default) == value and
+                                          (old is None or old.get(field, default) != value))
+    # no_longer_equals：上次等于、本次不再等于
+    return lambda old, new, changed: (old is not None and old.get(field, default) == value and
+                                      new.get(field, default) != value)
+
+
+class RuleSet:
+    """声明式推送/停止规则：加载时编译为谓词，相同条件只编译、只求值一次
+
+    规则格式：{"name": 名称, "when": [条件, ...], "notify": 是否推送, "stop": 是否停止}，
+    条件之间为“且”；条件格式：{"field": tdd 字段或 "ok"（"*" 表示任一字段）, "op": 运算, "value": 值, "default": 缺失时的值}。
+    """
+
+    def __init__(self, rules):
+        self._predicates = []
+        self._rules = []  # [(条件序号元组, 是否推送, 是否停止)]
+        self.watches_changes = False  # 存在 changed 条件时需要字段级差异
+        history_fields = []
+        keys = {}
+        for rule in rules:
+            indexes = []
+            for condition in rule.get("when") or []:
+                key = json.dumps(condition, ensure_ascii=False, sort_keys=True)
+                if key not in keys:
+                    keys[key] = len(self._predicates)
+                    self._predicates.append(compile_condition(condition))
+                indexes.append(keys[key])
+                self.watches_changes = self.watches_changes or condition.get("op") == "changed"
+                field = condition.get("field", "*")
+                if condition.get("op") in HISTORY_OPERATORS and field != "ok" and field not in history_fields:
+                    history_fields.append(field)
+            self._rules.append((tuple(indexes), bool(rule.get("notify", True)), bool(rule.get("stop", False))))
+        self.history_fields = tuple(history_fields)  # 判断时需要上次值的 tdd 字段（精简记录须保留）
+
+    def evaluate(self, old_fields, new_fields, changed=frozenset()):
+        """求值全部规则，返回 (是否推送, 是否停止)"""
+        results = [None] * len(self._predicates)
+        notify = stop = False
+        for indexes, rule_notify, rule_stop in self._rules:
+            # 该规则命中也不会改变结果时跳过
+            if (not rule_notify or notify) and (not rule_stop or stop):
+                continue
+            for index in indexes:
+                if results[index] is None:
+                    results[index] = self._predicates[index](old_fields, new_fields, changed)
+                if not results[index]:
+                    break
+            else:
+                notify = notify or rule_notify
+                stop = stop or rule_stop
+                if notify and stop:
+                    break
+        return notify, stop
+
+
+# 检查规则列表，返回错误信息列表（为空表示有效）
+def validate_rules(rules):
+    if not rules:
+        return []
+    if not isinstance(rules, list):
+        return ["rules 应为规则列表"]
+    errors = []
+    for index, rule in enumerate(rules, 1):
+        name = rule.get("name", f"第{index}条") if isinstance(rule, dict) else f"第{index}条"
+        try:
+            if not isinstance(rule, dict) or not isinstance(rule.get("when") or [], list):
+                raise ValueError("规则应为对象，when 应为条件列表")
+            for condition in rule.get("when") or []:
+                if not isinstance(condition, dict):
+                    raise ValueError("条件应为对象")
+                compile_condition(condition)
+        except ValueError as e:
+            errors.append(f"规则 {name}：{e}")
+    return errors
+
+
+PRESET_RULESETS = {mode: RuleSet(rules) for mode, rules in PRESETS.items()}
+_compiled = {}  # 自定义规则 JSON -> RuleSet（无效规则为 None），多名考生使用相同规则时共享
+
+
+# 取得配置对应的规则集：配置了 rules 时使用自定义规则，否则使用 query_mode 的内置规则
+# 自定义规则无效时（读取配置时已报告）同样使用内置规则
+def rules_for(config):
+    preset = PRESET_RULESETS.get(config.get('query_mode'), PRESET_RULESETS[1])
+    rules = config.get('rules')
+    if not rules:
+        return preset
+    key = json.dumps(rules, ensure_ascii=False, sort_keys=True)
+    if key not in _compiled:
+        _compiled[key] = None if validate_rules(rules) else RuleSet(rules)
+    return _compiled[key] or preset
@@ -0,0 +1,101 @@
+import math
+import random
+import time
+from datetime import datetime
+
+
+# 解析 "HH:MM" 为当天的分钟数
+def _parse_minutes(value):
+    hour, minute = value.split(":")
+    return int(hour) * 60 + int(minute)
+
+
+# 以上一次的计划时间为基准推进到下一次查询的绝对时间（time.monotonic），查询耗时不会累加到间隔上；
+# 查询耗时超过间隔时跳过已错过的时间点（不连续补发），保持原有节拍
+def advance_deadline(previous, delay, now=None):
+    now = time.monotonic() if now is None else now
+    deadline = previous + delay
+    if deadline < now:
+        if delay <= 0:
+            return now
+        deadline += math.ceil((now - deadline) / delay) * delay
+    return deadline
+
+
+class ScheduleWindow:
+    """时间窗口：在 [start, end) 时段内使用指定的查询间隔，支持跨零点（如 22:00-06:00）"""
+
+    def __init__(self, start, end, interval):
+        self.start = _parse_minutes(start)
+        self.end = _parse_minutes(end)
+        self.interval = float(interval)
+
+    def contains(self, moment):
+        minutes = moment.hour * 60 + moment.minute
+        if self.start <= self.end:
+            return self.start <= minutes < self.end
+        return minutes >= self.start or minutes < self.end
+
+
+class PollScheduler:
+    """自适应轮询调度：连续失败时指数退避，成功后恢复；叠加随机抖动与时间窗口"""
+
+    __slots__ = ("interval", "max_interval", "backoff_factor", "jitter", "windows", "failures")
+
+    def __init__(self, interval, max_interval=300.0, backoff_factor=2.0, jitter=0.1, windows=None):
+        """
+        :param interval: 默认查询间隔（秒），不在任何时间窗口内时使用
+        :param max_interval: 退避后的最大间隔（秒）
+        :param backoff_factor: 每次连续失败后间隔的放大倍数
+        :param jitter: 随机抖动比例（0.1 表示 ±10%），避免多个考生同步请求
+        :param windows: ScheduleWindow 列表，按顺序匹配第一个命中的窗口
+        """
+        self.interval = float(interval)
+        self.max_interval = float(max_interval)
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.windows = windows or []
+        self.failures = 0
+
+    @classmethod
+    def from_config(cls, config):
+        schedule = config.get('schedule') or {}
+        windows = [
+            ScheduleWindow(window['start'], window['end'], window['interval'])
+            for window in schedule.get('windows', [])
+        ]
+        return cls(
+            interval=config['interval'],
+            max_interval=schedule.get('max_interval', 300.0),
+            backoff_factor=schedule.get('backoff_factor', 2.0),
+            jitter=schedule.get('jitter', 0.1),
+            windows=windows
+        )
+
+    def spawn(self):
+        """创建参数与时间窗口相同、失败计数独立的调度器（多名考生共享同一份窗口配置）"""
+        return PollScheduler(self.interval, self.max_interval, self.backoff_factor, self.jitter, self.windows)
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+
+    def base_interval(self, moment=None):
+        """当前时间窗口对应的基础间隔"""
+        moment = moment or datetime.now()
+        for window in self.windows:
+            if window.contains(moment):
+                return window.interval
+        return self.interval
+
+    def next_delay(self, moment=None):
+        """计算下一次查询前的等待时间（秒）"""
+        delay = self.base_interval(moment)
+        if self.failures:
+            backoff = delay * self.backoff_factor ** min(self.failures, 32)
+            delay = max(delay, min(self.max_interval, backoff))
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(0.0, delay)
@@ -0,0 +1,177 @@
+import heapq
+import itertools
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+
+QUERY_URL = "http://58.199.250.102/query"
+
+# 静态请求头，随会话复用，不再每次查询重新构造
+QUERY_HEADERS = {
+    "Accept": "application/json, text/javascript, */*; q=0.01",
+    "Accept-Encoding": "gzip, deflate",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+    "Connection": "keep-alive",
+    "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+    "Host": "58.199.250.102",
+    "Origin": "http://58.199.250.102",
+    "Referer": "http://58.199.250.102/",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/138.0.0.0 Safari/537.36",
+    "X-Requested-With": "XMLHttpRequest"
+}
+
+
+# 按查询地址生成请求头：Host/Origin/Referer 与地址一致（用于镜像或代理地址）
+def headers_for(url):
+    parts = urlsplit(url)
+    origin = f"{parts.scheme}://{parts.netloc}"
+    return dict(QUERY_HEADERS, Host=parts.netloc, Origin=origin, Referer=origin + "/")
+
+
+# requests 读取响应体时把读超时包装为 ConnectionError，需还原为超时
+def _is_read_timeout(error):
+    return bool(error.args) and isinstance(error.args[0], ReadTimeoutError)
+
+
+# 截止时间到达时关闭响应所在的连接，使阻塞中的读取立即返回
+def _abort_response(response):
+    connection = getattr(response.raw, "connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class _Watchdog:
+    """共享的截止时间看门狗：一个后台线程按截止时间堆依次执行到期的回调，不为每个请求新建线程"""
+
+    def __init__(self):
+        self._heap = []  # [截止时间（monotonic）, 序号, 回调]，取消时回调置为 None
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, deadline, callback):
+        """在 deadline 调用 callback，返回可传给 cancel 的句柄"""
+        entry = [deadline, next(self._counter), callback]
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-deadline-watchdog", daemon=True)
+                self._thread.start()
+            heapq.heappush(self._heap, entry)
+            if self._heap[0] is entry:
+                self._condition.notify()
+        return entry
+
+    def cancel(self, entry):
+        """取消回调；返回后回调不会再执行（已执行的无法撤回）"""
+        with self._condition:
+            entry[2] = None
+
+    def _run(self):
+        with self._condition:
+            while True:
+                # 已取消的任务留在堆中，到达堆顶时丢弃
+                while self._heap and self._heap[0][2] is None:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                timeout = self._heap[0][0] - time.monotonic()
+                if timeout > 0:
+                    self._condition.wait(timeout)
+                    continue
+                callback = heapq.heappop(self._heap)[2]
+                # 持锁执行（只关闭连接，很快），保证 cancel 返回后回调不会再执行
+                callback()
+
+
+_watchdog = _Watchdog()
+
+
+class QueryTransport:
+    """查询接口传输层：长连接会话 + 连接池 + 超时控制"""
+
+    def __init__(self, url=QUERY_URL, headers=None, connect_timeout=3.0, read_timeout=10.0, pool_size=10,
+                 deadline=None):
+        """初始化会话，挂载连接池；deadline 为单次请求（含读取响应体）的总时长上限（秒）"""
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.deadline = deadline or None
+        self.session = requests.Session()
+        self.session.headers.clear()
+        self.session.headers.update(headers or QUERY_HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_config(cls, config):
+        """按配置文件中的超时设置创建传输层"""
+        return cls(
+            connect_timeout=config.get('connect_timeout', 3.0),
+            read_timeout=config.get('read_timeout', 10.0),
+            deadline=config.get('deadline')
+        )
+
+    def post(self, data):
+        """发送查询请求（复用已建立的连接），超时或超过截止时间抛出 requests.exceptions.Timeout"""
+        if self.deadline is None:
+            try:
+                return self.session.post(self.url, data=data, timeout=self.timeout)
+            except requests.exceptions.ConnectionError as e:
+                if _is_read_timeout(e):
+                    raise requests.exceptions.ReadTimeout(f"读取响应超时: {e}") from e
+                raise
+
+        # 读超时只限制单次 socket 读取，服务器慢速返回时总耗时可能远超：
+        # 收到响应头后由看门狗在截止时间关闭连接，打断仍在进行的响应体读取
+        started = time.monotonic()
+        connect_timeout, read_timeout = self.timeout
+        response = self.session.post(
+            self.url, data=data, stream=True,
+            timeout=(min(connect_timeout, self.deadline), min(read_timeout, self.deadline))
+        )
+        expired = threading.Event()
+
+        def abort():
+            expired.set()
+            _abort_response(response)
+
+        watch = _watchdog.schedule(started + self.deadline, abort)
+        chunks = []
+        try:
+            for chunk in response.iter_content(8192):
+                chunks.append(chunk)
+        except Exception as e:
+            response.close()
+            if expired.is_set():
+                raise requests.exceptions.Timeout(f"超过单次请求截止时间 {self.deadline} 秒") from e
+            if isinstance(e, requests.exceptions.ConnectionError) and _is_read_timeout(e):
+                raise requests.exceptions.ReadTimeout(f"读取响应超时: {e}") from e
+            raise
+        except BaseException:
+            response.close()
+            raise
+        finally:
+            _watchdog.cancel(watch)
+        response._content = b"".join(chunks)
+        return response
+
+    def close(self):
+        """关闭会话，释放连接池"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,15 +1,27 @@
-import json
-import logging
 import os
 import sys
+import threading
 import time
-from datetime import datetime
 
 import keyboard
-import requests
 
-from Notifier import NotifierBase
-from Push import PushPlusNotifier, ServerChanTurboNotifier
+from Config import StateStore, read_config, save_config
+from Breaker import CircuitBreaker
+from Coalesce import NotificationCoalescer
+from Diff import ResponseDiffer, body_digest
+from Dispatcher import NotificationDispatcher
+from Endpoints import create_transport
+from Engine import build_engine, run_engine
+from Errors import QueryDecodeError
+from History import HistoryStore
+from Logs import QueuedLogging, log_poll
+from Metrics import UNCHANGED, MetricsExporter
+from Push import close_clients
+from Query import decode_response, fetch_data, format_partial_hide, handle_query_mode, init_notifier
+from RateLimiter import TokenBucket
+from Roster import validate_ksh, validate_sfzh
+from Rules import rules_for
+from Scheduler import PollScheduler, advance_deadline
 
 
 # 清除屏幕
@@ -17,92 +29,9 @@ def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
 
 
-# 配置日志
-def setup_logger():
-    log_dir = "logs"
-    os.makedirs(log_dir, exist_ok=True)
-    log_filename = f"{log_dir}/query_{datetime.now().strftime('%Y%m%d')}.log"
-    logging.basicConfig(
-        filename=log_filename,
-        level=logging.ERROR,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S',
-        encoding='utf-8'
-    )
-    return logging.getLogger(__name__)
-
-
-# 读取配置（递归合并默认配置）
-def read_config():
-    config_path = "config.json"
-    default_config = {
-        "ksh": "",
-        "sfzh": "",
-        "interval": 5.0,
-        "query_mode": 1,
-        "push": {
-            "method": "none",
-            "pushplus_token": "",
-            "serverchan_token": ""
-        },
-        "last_response": None
-    }
-
-    # 递归合并配置（补充缺失键，不覆盖已有键）
-    def merge_dict(target, source):
-        for k, v in source.items():
-            if isinstance(v, dict) and k in target and isinstance(target[k], dict):
-                merge_dict(target[k], v)
-            else:
-                target.setdefault(k, v)
-
-    if not os.path.exists(config_path):
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(default_config, f, ensure_ascii=False, indent=4)
-        return default_config
-
-    try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        merge_dict(config, default_config)
-        return config
-    except Exception as e:
-        print(f"配置文件错误，使用默认配置: {e}")
-        return default_config
-
-
-# 保存配置
-def save_config(config):
-    try:
-        with open("config.json", 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=4)
-        return True
-    except Exception as e:
-        print(f"配置保存失败: {e}")
-        return False
-
-
-# 初始化推送器
-def init_notifier(push_method, pushplus_token, serverchan_token) -> None | NotifierBase:
-    title = "录取通知"
-    content = "恭喜！您已成功录取，请及时查看详情。"
-    if push_method == "pushplus" and pushplus_token:
-        return PushPlusNotifier(
-            token=pushplus_token,
-            title=title,
-            content=content,
-            interval_seconds=10,
-            duration_minutes=10
-        )
-    elif push_method == "serverchan_turbo" and serverchan_token:
-        return ServerChanTurboNotifier(
-            token=serverchan_token,
-            title=title,
-            content=content,
-            interval_seconds=10,
-            duration_minutes=10
-        )
-    return None
+# 配置日志：记录经队列交给后台线程写入 logs/query.log（JSON 行，午夜与超过大小时轮转）
+def setup_logger(config):
+    return QueuedLogging.from_config(config)
 
 
 # 键盘选择菜单
@@ -143,13 +72,6 @@ def keyboard_menu(menu_title, menu_items, current_selection=None):
                 selected_index = result
 
 
-# 格式化部分隐藏显示
-def format_partial_hide(value):
-    if not value or len(value) <= 7:
-        return value
-    return f"{value[:3]}{'*' * (len(value) - 7)}{value[-4:]}"
-
-
 # 通用输入验证函数
 def input_and_validate(prompt, current_value, validator, formatter=lambda x: x):
     """
@@ -174,17 +96,6 @@ def input_and_validate(prompt, current_value, validator, formatter=lambda x: x):
 # 预填信息
 def prefill_info(config):
     try:
-        # 考生号验证器
-        def validate_ksh(value):
-            return True, "" if len(value) == 14 and value.isdigit() else (False, "考生号格式不正确，应为14位数字！")
-
-        # 身份证号验证器
-        def validate_sfzh(value):
-            upper_val = value.upper()
-            if len(upper_val) == 18 and upper_val[:-1].isdigit() and (upper_val[-1].isdigit() or upper_val[-1] == 'X'):
-                return True, ""
-            return False, "身份证号格式不正确，应为18位数字（最后一位可为X）！"
-
         while True:
             ksh_status = format_partial_hide(config['ksh']) if config['ksh'] else "未填写"
             sfzh_status = format_partial_hide(config['sfzh']) if config['sfzh'] else "未填写"
@@ -275,11 +186,12 @@ def configure_query(config):
                 push_methods = [
                     "1. PushPlus（需输入token）",
                     "2. ServerChan Turbo（需输入token）",
+                    "3. 同时使用以上两种（并行推送，任一成功即可）",
                     "0. 不使用推送"
                 ]
-                method_map = {0: "pushplus", 1: "serverchan_turbo", 2: "none"}
+                method_map = {0: "pushplus", 1: "serverchan_turbo", 2: "pushplus,serverchan_turbo", 3: "none"}
                 current_method = config['push']['method']
-                current_selection = 2 if current_method == "none" else 0 if current_method == "pushplus" else 1
+                current_selection = {v: k for k, v in method_map.items()}.get(current_method, 3)
 
                 method_choice = keyboard_menu("选择推送方式", push_methods, current_selection)
                 if method_choice == -1:
@@ -304,6 +216,21 @@ def configure_query(config):
                     print("配置已保存\n")
                     input("按回车键返回...")
 
+                elif push_method == "pushplus,serverchan_turbo":
+                    print("\n===== 设置多渠道推送 =====")
+                    token = input(f"请输入PushPlus token（当前：{config['push']['pushplus_token']}）：").strip()
+                    config['push']['pushplus_token'] = token or config['push']['pushplus_token']
+                    token = input(f"请输入ServerChan Turbo token（当前：{config['push']['serverchan_token']}）：").strip()
+                    config['push']['serverchan_token'] = token or config['push']['serverchan_token']
+                    enabled = [method for method, token in (
+                        ("pushplus", config['push']['pushplus_token']),
+                        ("serverchan_turbo", config['push']['serverchan_token'])
+                    ) if token]
+                    config['push']['method'] = ",".join(enabled) or "none"
+                    save_config(config)
+                    print("配置已保存\n")
+                    input("按回车键返回...")
+
                 else:
                     config['push']['method'] = "none"
                     save_config(config)
@@ -360,111 +287,24 @@ def test_push(config):
         time.sleep(1)
 
 
-# 发送通知（用字段列表简化内容生成）
-def send_notification(notifier: None | NotifierBase, response_json, current_time):
-    if not notifier:
-        return False
-
-    tdd_data = response_json.get("tdd", {})
-    # 定义需要提取的字段（键名: (显示名, 默认值)）
-    fields = [
-        ("xm", "姓名", "未知姓名"),
-        ("xy", "录取学院", "未知学院"),
-        ("result", "录取专业", "未知专业"),
-        ("tzsbh", "通知书编号", "未知编号"),
-        ("dh", "EMS单号", "未知单号"),
-        ("txdz", "通讯地址", "未知地址"),
-    ]
-    info_lines = [f"{label}：{tdd_data.get(key, default)}" for key, label, default in fields]
-
-    push_content = (
-        f"🎉 厦门理工学院录取信息更新 🎉\n\n"
-        f"📌 基本信息\n"
-        f"{info_lines[0]}\n\n"  # 姓名
-        f"🎓 录取详情\n"
-        f"{info_lines[1]}\n"    # 学院
-        f"{info_lines[2]}\n\n"  # 专业
-        f"📜 通知书信息\n"
-        f"{info_lines[3]}\n"    # 通知书编号
-        f"{info_lines[4]}\n"    # EMS单号
-        f"{info_lines[5]}\n\n"  # 地址
-        f"⏰ 查询时间：{current_time}"
-    )
-
-    try:
-        notifier.send(title="厦门理工学院录取信息更新", message=push_content)
-        print("推送成功\n")
-        return True
-    except Exception as e:
-        print(f"推送失败: {str(e)}\n")
-        return False
-
-
-# 拆分：发送查询请求
-def fetch_data(ksh, sfzh):
-    try:
-        response = requests.post(
-            url="http://58.199.250.102/query",
-            headers={
-                "Accept": "application/json, text/javascript, */*; q=0.01",
-                "Accept-Encoding": "gzip, deflate",
-                "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-                "Connection": "keep-alive",
-                "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-                "Host": "58.199.250.102",
-                "Origin": "http://58.199.250.102",
-                "Referer": "http://58.199.250.102/",
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/138.0.0.0 Safari/537.36",
-                "X-Requested-With": "XMLHttpRequest"
-            },
-            data={"ksh": ksh, "sfzh": sfzh}
-        )
-        response.raise_for_status()
-        return response
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"查询失败: {str(e)}")
-
-
-# 拆分：处理查询模式逻辑
-def handle_query_mode(response_json, config, last_response, notifier, current_time):
-    tdd_data = response_json.get("tdd", {})
-    should_stop = False
-
-    if config['query_mode'] == 3:
-        # 模式3：检测数据变更
-        if last_response is not None and response_json != last_response:
-            print("检测到数据变更！")
-            send_notification(notifier, response_json, current_time)
-            last_response = response_json
-        elif last_response is None:
-            last_response = response_json
-        return last_response, False  # 不停止查询
-
-    if "ok" in response_json and response_json["ok"] is True:
-        # 打印录取信息
-        print(f"查询结果：已录取 - {tdd_data.get('xm', '未知姓名')}（{tdd_data.get('ksh', '未知考生号')}）")
-        print(f"学院：{tdd_data.get('xy', '未知学院')}，专业：{tdd_data.get('result', '未知专业')}")
-        print(f"通知书编号：{tdd_data.get('tzsbh', '未知编号')}，EMS单号：{tdd_data.get('dh', '未知单号')}")
-        print(f"通讯地址：{tdd_data.get('txdz', '未知地址')}\n")
-
-        # 模式1：查到录取停止
-        if config['query_mode'] == 1:
-            send_notification(notifier, response_json, current_time)
-            should_stop = True
-        # 模式2：EMS单号非"暂未发出"时停止
-        elif config['query_mode'] == 2 and tdd_data.get('dh', "暂未发出") != "暂未发出":
-            send_notification(notifier, response_json, current_time)
-            should_stop = True
-
-    return response_json, should_stop
-
-
 # 开始查询（主逻辑拆分后更简洁）
 def start_query(config, logger):
+    exporter = MetricsExporter(config)
     try:
         print("\n===== 开始查询 =====")
         print("按ESC键停止查询并返回上一层\n")
 
+        # 配置了多考生列表时交给并发引擎
+        if config.get('candidates'):
+            engine = build_engine(config, logger)
+            keyboard.on_press(lambda event: engine.stop() if event.name == 'esc' else None)
+            try:
+                run_engine(config, engine)
+            finally:
+                keyboard.unhook_all()
+            input("按回车键返回...")
+            return
+
         if not config['ksh'] or not config['sfzh']:
             print("请先填写考生号和身份证号！\n")
             input("按回车键返回...")
@@ -478,73 +318,111 @@ def start_query(config, logger):
         method_name = {
             "pushplus": "PushPlus",
             "serverchan_turbo": "ServerChan Turbo",
+            "pushplus,serverchan_turbo": "PushPlus + ServerChan Turbo",
             "none": ""
         }.get(config['push']['method'], "")
         print(f"已启用 {method_name} 推送\n" if method_name else "未启用推送功能\n")
+        dispatcher = NotificationDispatcher().start()
+        coalescer = NotificationCoalescer.from_config(config, dispatcher)
+        if coalescer is not None:
+            notifier = coalescer.start().wrap(notifier, config['ksh'], format_partial_hide(config['ksh']))
+        else:
+            notifier = dispatcher.wrap(notifier)
 
         query_count = 0
-        last_response = config['last_response']
-        stop_flag = False
+        state = StateStore()
+        last_response = state.get(config['ksh'], config.get('last_response'))
+        differ = ResponseDiffer(config['ignore_fields'])
+        rules = rules_for(config)
+        label = format_partial_hide(config['ksh'])
+        last_digest = None
+        history = HistoryStore.from_config(config)
+        stop_event = threading.Event()
 
         def on_esc_press(event):
-            nonlocal stop_flag
             if event.name == 'esc' and event.event_type == keyboard.KEY_DOWN:
-                stop_flag = True
+                stop_event.set()
 
         keyboard.on_press(on_esc_press)
+        transport = create_transport(config)
+        limiter = TokenBucket.from_config(config)
+        scheduler = PollScheduler.from_config(config)
+        breaker = CircuitBreaker.from_config(config)
 
         try:
-            while not stop_flag:
+            deadline = time.monotonic()  # 本次查询的计划时间
+            while not stop_event.is_set():
                 query_count += 1
                 current_time = time.strftime("%H:%M:%S")
+                started = time.monotonic()
                 try:
-                    response = fetch_data(config['ksh'], config['sfzh'])
+                    response = fetch_data(config['ksh'], config['sfzh'], transport, limiter, breaker)
                     print(f"[{current_time}] 第{query_count}次查询 - 状态码：{response.status_code}")
 
-                    try:
-                        response_json = response.json()
-                        last_response, should_stop = handle_query_mode(
-                            response_json, config, last_response, notifier, current_time
-                        )
-                        config['last_response'] = last_response
-                        save_config(config)
-
-                        if should_stop:
-                            print("查询结束（已检测到目标结果）")
-                            input("按回车键返回...")
-                            break
-
-                    except json.JSONDecodeError:
-                        print("响应解析错误，不是有效的JSON格式")
-                        logger.error("响应解析错误，不是有效的JSON格式")
+                    # 响应体与上次逐字节相同时只计数，跳过解析、模式判断与持久化
+                    digest = body_digest(response.content)
+                    if digest == last_digest:
+                        UNCHANGED.inc()
+                        scheduler.record_success()
+                        log_poll(logger, label, response.status_code, started, query_count)
+                    else:
+                        try:
+                            response_json = decode_response(response)
+                            if history is not None:
+                                history.record(config['ksh'], response_json, query_count)
+                            last_response, should_stop = handle_query_mode(
+                                response_json, config, last_response, notifier, current_time, differ, rules
+                            )
+                            state.set(config['ksh'], last_response)
+                            last_digest = digest
+                            scheduler.record_success()
+                            log_poll(logger, label, response.status_code, started, query_count)
+
+                            if should_stop:
+                                print("查询结束（已检测到目标结果）")
+                                input("按回车键返回...")
+                                break
+
+                        except QueryDecodeError:
+                            scheduler.record_failure()
+                            print("响应解析错误，不是有效的JSON格式")
+                            log_poll(logger, label, "QueryDecodeError", started, query_count,
+                                     "响应解析错误，不是有效的JSON格式")
 
                 except Exception as e:
+                    scheduler.record_failure()
                     print(f"查询失败: {str(e)}")
-                    logger.error(f"查询失败: {str(e)}")
+                    log_poll(logger, label, type(e).__name__, started, query_count, e)
 
-                # 带ESC检测的等待
-                for _ in range(int(config['interval'] * 10)):
-                    if stop_flag:
-                        break
-                    time.sleep(0.1)
+                # 等待到下一次查询的计划时间（间隔由调度器按失败次数与时间窗口计算，从上次计划时间起算），按ESC立即结束
+                deadline = advance_deadline(deadline, scheduler.next_delay())
+                stop_event.wait(max(0.0, deadline - time.monotonic()))
 
         finally:
             keyboard.unhook_all()
-            if stop_flag:
+            transport.close()
+            state.close()
+            if history is not None:
+                history.close()
+            if coalescer is not None:
+                coalescer.close()
+            dispatcher.close()
+            if stop_event.is_set():
                 print("\n用户终止查询")
-                config['last_response'] = last_response
-                save_config(config)
                 input("按回车键返回...")
 
     except KeyboardInterrupt:
         print("\n返回上一层...")
         time.sleep(1)
+    finally:
+        exporter.close()
 
 
 # 主菜单
 def main_menu():
-    logger = setup_logger()
     config = read_config()
+    logging_service = setup_logger(config)
+    logger = logging_service.logger
 
     menu_items = [
         "1. 预填信息 - 填写考生号以及身份证号",
@@ -577,6 +455,9 @@ def main_menu():
                 break
     except KeyboardInterrupt:
         print("\n程序退出")
+    finally:
+        close_clients()
+        logging_service.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,39 @@
+import json
+
+from Notifier import NotifierBase
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingNotifier(NotifierBase):
+    """只记录推送内容的推送器（不限制频率）"""
+
+    def __init__(self, clock=None, duration_minutes=10):
+        super().__init__("录取通知", "测试", interval_seconds=0, duration_minutes=duration_minutes,
+                         clock=clock or FakeClock())
+        self.sent = []
+
+    def send_message(self, title, message):
+        self.sent.append((title, message))
+
+
+class FakeResponse:
+    """与 requests.Response 接口一致的最小响应：content + json()"""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.content = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def admitted(**tdd):
+    return {"ok": True, "tdd": {"xm": "张三", "xy": "计算机学院", "result": "软件工程", "tzsbh": "0001",
+                                "dh": "暂未发出", "txdz": "厦门", **tdd}}
@@ -0,0 +1,50 @@
+from Coalesce import NotificationCoalescer
+from Dispatcher import NotificationDispatcher
+from Metrics import NOTIFY_EVENTS
+
+from helpers import FakeClock, RecordingNotifier
+
+
+def counts():
+    return {result: NOTIFY_EVENTS.get(result=result) for result in ("received", "delivered", "dropped")}
+
+
+def run_coalescer(events):
+    """events: [(推送器, 考生号, 内容)]，全部提交后关闭合并器与调度器"""
+    dispatcher = NotificationDispatcher(base_delay=0.01).start()
+    coalescer = NotificationCoalescer(dispatcher, window=0.05).start()
+    for notifier, key, message in events:
+        coalescer.wrap(notifier, key).send("录取通知", message)
+    coalescer.close(timeout=5.0)
+    dispatcher.close(timeout=5.0)
+
+
+def test_event_after_duration_window_is_delivered():
+    clock = FakeClock()
+    notifier = RecordingNotifier(clock)
+    clock.now += 11 * 60  # 启动 11 分钟后才查到录取
+    before = counts()
+
+    run_coalescer([(notifier, "25350101100001", "已录取")])
+
+    after = counts()
+    assert notifier.sent == [("录取通知", "已录取")]
+    assert after["received"] - before["received"] == 1
+    assert after["delivered"] - before["delivered"] == 1
+    assert after["dropped"] == before["dropped"]
+
+
+def test_episode_restarts_only_after_expiry():
+    clock = FakeClock()
+    notifier = RecordingNotifier(clock)
+    started = notifier.start_time
+
+    clock.now += 5 * 60
+    notifier.start_episode()
+    assert notifier.start_time == started
+
+    clock.now += 6 * 60
+    assert notifier.expired()
+    notifier.start_episode()
+    assert notifier.start_time == clock.now
+    assert not notifier.expired()
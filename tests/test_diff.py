@@ -0,0 +1,36 @@
+from Diff import UNRECORDED, ResponseDiffer, ResponseSummary, summary_fields
+
+from helpers import admitted
+
+
+def test_differ_reports_field_changes_and_skips_identical_responses():
+    differ = ResponseDiffer(ignore_fields=("cxsj",))
+    first = admitted(cxsj="10:00")
+    assert differ.compare(None, first) == []
+    assert differ.compare(first, admitted(cxsj="10:05")) == []
+    assert differ.compare(first, admitted(dh="EMS1")) == [("dh", "暂未发出", "EMS1")]
+
+
+def test_kept_fields_detects_changes_outside_the_summary():
+    differ = ResponseDiffer(kept_fields=summary_fields())
+    last = None
+    changes = []
+    for response in (admitted(), admitted(xm="李四"), admitted(xm="李四", dh="EMS1")):
+        changes.append(differ.compare(last, response))
+        last = ResponseSummary.from_response(response)
+    assert changes == [[], [("xm", UNRECORDED, "李四")], [("dh", "暂未发出", "EMS1")]]
+
+
+def test_kept_fields_after_restart_compares_only_recorded_fields():
+    restored = ResponseSummary.from_response(admitted()).to_dict()
+    differ = ResponseDiffer(kept_fields=summary_fields())
+    assert differ.compare(restored, admitted()) == []
+    assert differ.compare(restored, admitted(dh="EMS1")) == [("dh", "暂未发出", "EMS1")]
+
+
+def test_summary_keeps_extra_fields_and_shares_key_tuples():
+    summary = ResponseSummary.from_response(admitted(txdz="厦门"), ("txdz", "dh"))
+    assert summary.get("tdd")["txdz"] == "厦门"
+    assert "xm" not in summary.get("tdd")
+    assert summary_fields(("txdz",)) is summary_fields(("txdz",))
+    assert ResponseSummary.from_response(summary.to_dict(), ("txdz",)) == summary
@@ -0,0 +1,59 @@
+import pytest
+
+from Engine import Candidate, QueryEngine
+from Query import handle_query_mode
+from Rules import rules_for
+
+from helpers import FakeResponse, RecordingNotifier, admitted
+
+RULES = {
+    "txdz 不再是 A": [{"name": "地址变更", "when": [{"field": "txdz", "op": "no_longer_equals", "value": "A"}]}],
+    "xm 变为 李四": [{"name": "姓名变更", "when": [{"field": "xm", "op": "became", "value": "李四"}]}],
+}
+
+SEQUENCES = {
+    "txdz 不再是 A": [admitted(txdz="A"), admitted(txdz="B"), admitted(txdz="B", dh="EMS1")],
+    "xm 变为 李四": [admitted(xm="李四"), admitted(xm="李四", dh="EMS1"), admitted(xm="李四", dh="EMS2")],
+}
+
+
+def pushes_with_full_response(rules, responses):
+    """main.py / Check.py / Replay.py 的路径：上次结果为完整响应"""
+    config = {"query_mode": 1, "rules": rules}
+    notifier, last_response = RecordingNotifier(), None
+    for response in responses:
+        last_response, _ = handle_query_mode(response, config, last_response, notifier, "12:00:00",
+                                             rules=rules_for(config))
+    return len(notifier.sent)
+
+
+def pushes_with_candidate(rules, responses):
+    """Daemon.py / Pool.py 的路径：上次结果为 Candidate 的精简记录"""
+    notifier = RecordingNotifier()
+    candidate = Candidate("25350101100001", "1" * 18, notifier=notifier, rules=rules)
+    engine = QueryEngine([candidate], transport=object())
+    for response in responses:
+        engine._process(candidate, FakeResponse(response), "12:00:00")
+    return len(notifier.sent)
+
+
+@pytest.mark.parametrize("name", sorted(RULES))
+def test_history_rules_match_full_response_path(name):
+    expected = pushes_with_full_response(RULES[name], SEQUENCES[name])
+    assert pushes_with_candidate(RULES[name], SEQUENCES[name]) == expected
+
+
+def test_no_longer_equals_on_non_summary_field_pushes_once():
+    assert pushes_with_candidate(RULES["txdz 不再是 A"], SEQUENCES["txdz 不再是 A"]) == 1
+
+
+def test_became_on_non_summary_field_does_not_repeat():
+    assert pushes_with_candidate(RULES["xm 变为 李四"], SEQUENCES["xm 变为 李四"]) == 1
+
+
+def test_summary_round_trips_history_fields():
+    candidate = Candidate("25350101100001", "1" * 18, last_response=admitted(txdz="A"),
+                          rules=RULES["txdz 不再是 A"])
+    restored = Candidate("25350101100001", "1" * 18, last_response=candidate.last_response_dict(),
+                         rules=RULES["txdz 不再是 A"])
+    assert restored.last_response.get("tdd")["txdz"] == "A"
@@ -0,0 +1,22 @@
+from Metrics import Registry
+
+
+def test_drain_and_merge_move_deltas_between_registries():
+    worker, coordinator = Registry(), Registry()
+    requests = worker.counter("requests_total")
+    latency = worker.histogram("fetch_seconds", buckets=(0.1, 1.0))
+    requests.inc(3)
+    requests.inc(result="sent")
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    coordinator.merge(worker.drain())
+    assert coordinator.counter("requests_total").total() == 4
+    assert coordinator.counter("requests_total").get(result="sent") == 1
+    assert coordinator.histogram("fetch_seconds", buckets=(0.1, 1.0)).count == 2
+
+    # 取出后清零：再次取出没有增量，合并不会重复计数
+    assert worker.drain() == {}
+    requests.inc()
+    coordinator.merge(worker.drain())
+    assert coordinator.counter("requests_total").total() == 5
@@ -0,0 +1,36 @@
+from Pool import HashRing
+
+KEYS = [f"{index:014d}" for index in range(2000)]
+
+
+def test_keys_spread_over_all_nodes():
+    ring = HashRing(range(4))
+    counts = {}
+    for key in KEYS:
+        node = ring.get(key)
+        counts[node] = counts.get(node, 0) + 1
+    assert set(counts) == {0, 1, 2, 3}
+    assert min(counts.values()) > len(KEYS) / 4 / 2
+
+
+def test_removing_a_node_only_moves_its_keys():
+    ring = HashRing(range(4))
+    before = {key: ring.get(key) for key in KEYS}
+    ring.remove(2)
+    assert ring.nodes == {0, 1, 3}
+    for key, node in before.items():
+        if node != 2:
+            assert ring.get(key) == node
+        else:
+            assert ring.get(key) != 2
+
+
+def test_empty_ring_raises():
+    ring = HashRing([0])
+    ring.remove(0)
+    try:
+        ring.get("25350101100001")
+    except LookupError:
+        pass
+    else:
+        raise AssertionError("空哈希环应抛出 LookupError")
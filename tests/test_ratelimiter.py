@@ -0,0 +1,24 @@
+import pytest
+
+from RateLimiter import TokenBucket
+
+
+def test_reserve_allows_burst_then_spaces_requests():
+    bucket = TokenBucket(rate=1, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+    assert bucket.reserve() == pytest.approx(2.0, abs=0.05)
+
+
+def test_from_config_splits_rate_between_workers():
+    assert TokenBucket.from_config({}) is None
+    assert TokenBucket.from_config({"rate_limit": {"rate": 0}}) is None
+    bucket = TokenBucket.from_config({"rate_limit": {"rate": 10, "burst": 4}}, shares=4)
+    assert bucket.rate == 2.5
+    assert bucket.capacity == 1
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
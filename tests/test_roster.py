@@ -0,0 +1,44 @@
+import pytest
+
+from Roster import read_csv_chunks, validate_rows, validate_sfzh
+
+VALID_SFZH = "11010519491231002X"
+
+
+@pytest.mark.parametrize("value, valid", [
+    (VALID_SFZH, True),
+    (VALID_SFZH.lower(), True),
+    ("110105194912310021", False),  # 校验码错误
+    ("11010519491231002", False),   # 位数不足
+    ("1101051949123100XX", False),
+])
+def test_validate_sfzh(value, valid):
+    assert validate_sfzh(value)[0] is valid
+
+
+def test_read_csv_chunks_skips_blank_rows(tmp_path):
+    path = tmp_path / "roster.csv"
+    rows = ["ksh,sfzh,query_mode"] + [""] * 5
+    rows += ["25350101100001,%s,1" % VALID_SFZH, "", ",,", "25350101100002,%s," % VALID_SFZH]
+    path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    chunks = list(read_csv_chunks(str(path), chunk_size=1))
+    assert [[row["ksh"] for _, row in chunk] for chunk in chunks] == [["25350101100001"], ["25350101100002"]]
+    assert [line for chunk in chunks for line, _ in chunk] == [7, 10]
+
+
+def test_read_csv_chunks_without_header(tmp_path):
+    path = tmp_path / "roster.csv"
+    path.write_text("25350101100001,%s\n" % VALID_SFZH, encoding="utf-8")
+    assert list(read_csv_chunks(str(path))) == [[(1, {"ksh": "25350101100001", "sfzh": VALID_SFZH})]]
+
+
+def test_validate_rows_reports_errors_and_duplicates():
+    seen = {"25350101100001"}
+    chunk = [
+        (2, {"ksh": "25350101100001", "sfzh": VALID_SFZH}),
+        (3, {"ksh": "25350101100002", "sfzh": VALID_SFZH.lower(), "query_mode": "3"}),
+        (4, {"ksh": "123", "sfzh": VALID_SFZH, "query_mode": "9"}),
+    ]
+    entries, errors = validate_rows(chunk, seen)
+    assert entries == [None, {"ksh": "25350101100002", "sfzh": VALID_SFZH, "query_mode": 3}]
+    assert [line for line, _ in errors] == [4]
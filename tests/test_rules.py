@@ -0,0 +1,98 @@
+import pytest
+
+from Query import handle_query_mode
+from Rules import PRESET_RULESETS, RuleSet, compile_condition, rules_for, validate_rules
+
+from helpers import RecordingNotifier, admitted
+
+NOT_ADMITTED = {"ok": False, "tdd": {}}
+
+SEQUENCES = [
+    [NOT_ADMITTED, NOT_ADMITTED, admitted(), admitted()],
+    [NOT_ADMITTED, admitted(), admitted(dh="EMS1"), admitted(dh="EMS1")],
+    [admitted(), admitted(dh="EMS1"), admitted(dh="EMS1", txdz="新地址")],
+    [admitted(dh="EMS1")],
+]
+
+
+def baseline_mode(response_json, query_mode, last_response):
+    """原版 main.py 的 handle_query_mode：返回 (是否推送, 新的上次结果, 是否停止)"""
+    if query_mode == 3:
+        if last_response is not None and response_json != last_response:
+            return True, response_json, False
+        return False, last_response if last_response is not None else response_json, False
+    if response_json.get("ok") is True:
+        if query_mode == 1:
+            return True, response_json, True
+        if query_mode == 2 and response_json.get("tdd", {}).get("dh", "暂未发出") != "暂未发出":
+            return True, response_json, True
+    return False, response_json, False
+
+
+def run(query_mode, responses, step):
+    """按顺序处理响应直到停止，返回每次 (是否推送, 是否停止)"""
+    outcomes, last_response = [], None
+    for response in responses:
+        notify, last_response, stop = step(response, query_mode, last_response)
+        outcomes.append((notify, stop))
+        if stop:
+            break
+    return outcomes
+
+
+def preset_mode(response_json, query_mode, last_response):
+    notifier = RecordingNotifier()
+    last_response, stop = handle_query_mode(response_json, {"query_mode": query_mode}, last_response, notifier,
+                                            "12:00:00")
+    return bool(notifier.sent), last_response, stop
+
+
+@pytest.mark.parametrize("query_mode", [1, 2, 3])
+@pytest.mark.parametrize("responses", SEQUENCES)
+def test_presets_match_baseline_modes(query_mode, responses):
+    assert run(query_mode, responses, preset_mode) == run(query_mode, responses, baseline_mode)
+
+
+def test_rules_for_falls_back_to_preset_for_invalid_rules():
+    assert rules_for({"query_mode": 2}) is PRESET_RULESETS[2]
+    assert rules_for({"query_mode": 3, "rules": [{"when": [{"field": "xm", "op": "unknown"}]}]}) is PRESET_RULESETS[3]
+    assert rules_for({"query_mode": 7}) is PRESET_RULESETS[1]
+
+
+@pytest.mark.parametrize("spec, old, new, changed, expected", [
+    ({"field": "ok", "op": "equals", "value": True}, None, {"ok": True}, set(), True),
+    ({"field": "dh", "op": "not_equals", "value": "暂未发出", "default": "暂未发出"}, None, {}, set(), False),
+    ({"field": "ok", "op": "became", "value": True}, {"ok": True}, {"ok": True}, set(), False),
+    ({"field": "ok", "op": "became", "value": True}, None, {"ok": True}, set(), True),
+    ({"field": "dh", "op": "no_longer_equals", "value": "暂未发出"}, None, {"dh": "EMS1"}, set(), False),
+    ({"field": "dh", "op": "no_longer_equals", "value": "暂未发出"}, {"dh": "暂未发出"}, {"dh": "EMS1"}, set(), True),
+    ({"field": "*", "op": "changed"}, {}, {}, {"xm"}, True),
+    ({"field": "dh", "op": "changed"}, {}, {}, {"xm"}, False),
+])
+def test_compile_condition(spec, old, new, changed, expected):
+    assert compile_condition(spec)(old, new, changed) is expected
+
+
+def test_rule_set_combines_conditions_and_rules():
+    rules = RuleSet([
+        {"name": "已录取", "when": [{"field": "ok", "op": "became", "value": True}], "notify": True},
+        {"name": "EMS已发出", "notify": True, "stop": True, "when": [
+            {"field": "ok", "op": "equals", "value": True},
+            {"field": "dh", "op": "no_longer_equals", "value": "暂未发出"}
+        ]},
+    ])
+    assert rules.history_fields == ("dh",)
+    assert rules.evaluate(None, {"ok": True, "dh": "暂未发出"}) == (True, False)
+    assert rules.evaluate({"ok": True, "dh": "暂未发出"}, {"ok": True, "dh": "暂未发出"}) == (False, False)
+    assert rules.evaluate({"ok": True, "dh": "暂未发出"}, {"ok": True, "dh": "EMS1"}) == (True, True)
+
+
+def test_validate_rules_reports_each_bad_rule():
+    errors = validate_rules([
+        {"name": "好", "when": [{"field": "ok", "op": "equals", "value": True}]},
+        {"name": "坏", "when": [{"field": "*", "op": "equals", "value": 1}]},
+        "不是对象",
+    ])
+    assert len(errors) == 2
+    assert errors[0].startswith("规则 坏")
+    assert validate_rules("x") == ["rules 应为规则列表"]
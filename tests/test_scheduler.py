@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pytest
+
+from Scheduler import PollScheduler, ScheduleWindow, advance_deadline
+
+
+@pytest.mark.parametrize("previous, delay, now, expected", [
+    (10.0, 5.0, 12.0, 15.0),   # 按时：下一个截止时间不受处理耗时影响
+    (10.0, 5.0, 15.0, 15.0),
+    (10.0, 5.0, 27.0, 30.0),   # 落后多个周期：跳到下一个整周期，不补发
+    (10.0, 0.0, 27.0, 27.0),
+])
+def test_advance_deadline(previous, delay, now, expected):
+    assert advance_deadline(previous, delay, now) == expected
+
+
+def test_window_across_midnight():
+    window = ScheduleWindow("22:00", "06:00", 60)
+    assert window.contains(datetime(2026, 7, 20, 23, 30))
+    assert window.contains(datetime(2026, 7, 21, 5, 59))
+    assert not window.contains(datetime(2026, 7, 21, 6, 0))
+
+
+def test_backoff_is_capped_and_resets_on_success():
+    scheduler = PollScheduler(5, max_interval=30, backoff_factor=2, jitter=0)
+    moment = datetime(2026, 7, 20, 12, 0)
+    assert scheduler.next_delay(moment) == 5
+    for _ in range(10):
+        scheduler.record_failure()
+    assert scheduler.next_delay(moment) == 30
+    scheduler.record_success()
+    assert scheduler.next_delay(moment) == 5
+
+
+def test_windows_override_interval_and_spawn_shares_them():
+    scheduler = PollScheduler(5, jitter=0, windows=[ScheduleWindow("09:00", "12:00", 1)])
+    child = scheduler.spawn()
+    child.record_failure()
+    assert child.windows is scheduler.windows
+    assert scheduler.next_delay(datetime(2026, 7, 20, 10, 0)) == 1
+    assert scheduler.next_delay(datetime(2026, 7, 20, 13, 0)) == 5
+    assert scheduler.failures == 0
@@ -0,0 +1,63 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from Transport import QueryTransport, _Watchdog
+
+
+class TrickleHandler(BaseHTTPRequestHandler):
+    """响应头立即返回，响应体每 0.1 秒只发一个字节（读超时永远不会触发）"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = b'{"ok": false, "pad": "' + b'x' * 40 + b'"}'
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            for byte in body:
+                self.wfile.write(bytes([byte]))
+                self.wfile.flush()
+                time.sleep(0.1)
+        except OSError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def trickle_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TrickleHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/query"
+    server.shutdown()
+    server.server_close()
+
+
+def test_deadline_interrupts_slow_body(trickle_url):
+    transport = QueryTransport(trickle_url, read_timeout=1.0, deadline=0.5)
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        transport.post({"ksh": "1", "sfzh": "2"})
+    assert time.monotonic() - started < 1.5
+    transport.close()
+
+
+def test_watchdog_runs_due_callbacks_in_order_and_skips_cancelled():
+    watchdog = _Watchdog()
+    fired = []
+    done = threading.Event()
+    now = time.monotonic()
+    watchdog.schedule(now + 0.10, lambda: (fired.append("late"), done.set()))
+    cancelled = watchdog.schedule(now + 0.02, lambda: fired.append("cancelled"))
+    watchdog.schedule(now + 0.05, lambda: fired.append("early"))
+    watchdog.cancel(cancelled)
+    assert done.wait(2.0)
+    assert fired == ["early", "late"]